@@ -1,8 +1,32 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, abort, g, has_request_context, request, jsonify, send_file
 import sqlite3
 import os
+import atexit
 import re
+import io
+import csv
+import gzip
+import hashlib
+import json
+import mimetypes
+import math
+import time
+import zlib
+import logging
+import tempfile
+import threading
 from datetime import datetime, timedelta
+from collections import OrderedDict, deque
+
+import xlsxwriter
+try:
+    import brotli             # optional: adds .br variants of the frontend assets
+except ImportError:
+    brotli = None
+
+import reading_analytics
+from init_db import (CARRY_FORWARD_FIELDS, DAILY_REPORT_BASE_COLUMNS, ensure_indexes, ensure_schema,
+                     fill_carry_forward_state)
 
 app = Flask(__name__, static_folder='frontend/build')
 
@@ -11,7 +35,438 @@ DATABASE = os.environ.get(
     os.path.join(os.path.dirname(__file__), 'homeschool_tracker.db')
 )
 
+# Pragmas applied to every connection handed out by get_db().  Each one can be
+# overridden from the environment, e.g. HSTRACKER_SQLITE_CACHE_SIZE=-64000.
+SQLITE_PRAGMAS = {
+    'journal_mode': os.environ.get('HSTRACKER_SQLITE_JOURNAL_MODE', 'WAL'),
+    'synchronous':  os.environ.get('HSTRACKER_SQLITE_SYNCHRONOUS', 'NORMAL'),
+    'busy_timeout': int(os.environ.get('HSTRACKER_SQLITE_BUSY_TIMEOUT', 5000)),      # ms
+    'cache_size':   int(os.environ.get('HSTRACKER_SQLITE_CACHE_SIZE', -16000)),      # negative = KiB
+    'mmap_size':    int(os.environ.get('HSTRACKER_SQLITE_MMAP_SIZE', 64 * 1024 * 1024)),
+    'temp_store':   os.environ.get('HSTRACKER_SQLITE_TEMP_STORE', 'MEMORY'),
+}
+
+# Application log; HSTRACKER_LOG_LEVEL=DEBUG brings back the per-request traces.
+log = logging.getLogger('hstracker')
+log.setLevel(os.environ.get('HSTRACKER_LOG_LEVEL', 'INFO').upper())
+if not logging.getLogger().handlers:
+    logging.basicConfig(format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
 NEAR_MISS_DELTA = 0.02
+MAX_RANGE_WEEKS = 260     # longest span /weekly-progress/<user>/<start>/<end> accepts
+FORECAST_WINDOW_DAYS = 14 # book forecasts project the reading pace of the last two weeks
+HISTORY_PAGE_SIZE = 100   # default ?limit= of /admin/weekly-results
+HISTORY_MAX_PAGE_SIZE = 1000
+
+_db_local = threading.local()
+_schema_checked = set()      # (pid, DATABASE) pairs ensure_schema() has run for
+
+# ---- request metrics ---------------------------------------------
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)   # seconds
+SLOW_QUERY_SECONDS = float(os.environ.get('HSTRACKER_SLOW_QUERY_MS', 100)) / 1000.0
+SLOW_QUERY_LOG_SIZE = 100     # most recent slow queries kept for /admin/metrics
+
+class RequestMetrics:
+    """Per-endpoint latency histograms and SQL usage, plus a log of recent slow queries.
+
+    Counters are per process; every gunicorn worker reports its own.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints = {}          # (endpoint, method) -> counters
+        self.slow_queries = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+        self.slow_query_count = 0
+
+    def observe(self, endpoint, method, status, seconds, statements, sql_seconds, connections):
+        with self._lock:
+            stats = self.endpoints.get((endpoint, method))
+            if stats is None:
+                stats = self.endpoints[(endpoint, method)] = {
+                    'count': 0, 'errors': 0, 'seconds': 0.0, 'max_seconds': 0.0,
+                    'buckets': [0] * (len(LATENCY_BUCKETS) + 1),      # last one is +Inf
+                    'sql_statements': 0, 'max_sql_statements': 0,
+                    'sql_seconds': 0.0, 'connections': 0}
+            stats['count'] += 1
+            stats['errors'] += status >= 500
+            stats['seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+            stats['buckets'][next((i for i, bound in enumerate(LATENCY_BUCKETS) if seconds <= bound),
+                                  len(LATENCY_BUCKETS))] += 1
+            stats['sql_statements'] += statements
+            stats['max_sql_statements'] = max(stats['max_sql_statements'], statements)
+            stats['sql_seconds'] += sql_seconds
+            stats['connections'] += connections
+
+    def slow_query(self, sql, seconds, endpoint):
+        with self._lock:
+            self.slow_query_count += 1
+            self.slow_queries.append({'endpoint': endpoint, 'ms': round(seconds * 1000, 1),
+                                      'sql': ' '.join(sql.split())[:500],
+                                      'at': datetime.now().isoformat(timespec='seconds')})
+        log.warning("Slow query (%.1f ms) in %s: %s", seconds * 1000, endpoint, ' '.join(sql.split()))
+
+    @staticmethod
+    def _quantile(stats, q):
+        """Upper bound of the bucket holding the q-quantile (max latency for the +Inf bucket)."""
+        rank, seen = q * stats['count'], 0
+        for bound, n in zip(LATENCY_BUCKETS, stats['buckets']):
+            seen += n
+            if seen >= rank:
+                return bound
+        return round(stats['max_seconds'], 4)
+
+    def snapshot(self):
+        with self._lock:
+            endpoints = {}
+            for (endpoint, method), s in sorted(self.endpoints.items()):
+                endpoints[f'{method} {endpoint}'] = {
+                    'count': s['count'], 'errors': s['errors'],
+                    'mean_ms': round(1000 * s['seconds'] / s['count'], 2),
+                    'max_ms': round(1000 * s['max_seconds'], 2),
+                    'p50_le_ms': 1000 * self._quantile(s, 0.50),
+                    'p95_le_ms': 1000 * self._quantile(s, 0.95),
+                    'p99_le_ms': 1000 * self._quantile(s, 0.99),
+                    'histogram': dict(zip([*map(str, LATENCY_BUCKETS), '+Inf'], s['buckets'])),
+                    'sql_statements_per_request': round(s['sql_statements'] / s['count'], 2),
+                    'max_sql_statements': s['max_sql_statements'],
+                    'sql_ms_per_request': round(1000 * s['sql_seconds'] / s['count'], 2),
+                    'connections_per_request': round(s['connections'] / s['count'], 2),
+                }
+            return {'pid': os.getpid(), 'endpoints': endpoints,
+                    'slow_query_threshold_ms': SLOW_QUERY_SECONDS * 1000,
+                    'slow_query_count': self.slow_query_count,
+                    'slow_queries': list(self.slow_queries)}
+
+    def prometheus(self):
+        """The counters in Prometheus text exposition format (version 0.0.4)."""
+        out = ['# HELP hstracker_request_duration_seconds Request latency by endpoint.',
+               '# TYPE hstracker_request_duration_seconds histogram']
+        with self._lock:
+            items = sorted(self.endpoints.items())
+            for (endpoint, method), s in items:
+                labels = f'endpoint="{endpoint}",method="{method}"'
+                cumulative = 0
+                for bound, n in zip([*map(str, LATENCY_BUCKETS), '+Inf'], s['buckets']):
+                    cumulative += n
+                    out.append(f'hstracker_request_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+                out.append(f'hstracker_request_duration_seconds_sum{{{labels}}} {s["seconds"]:.6f}')
+                out.append(f'hstracker_request_duration_seconds_count{{{labels}}} {s["count"]}')
+            for name, key, help_text in (
+                    ('hstracker_request_errors_total', 'errors', 'Requests answered with a 5xx status.'),
+                    ('hstracker_sql_statements_total', 'sql_statements', 'SQL statements executed.'),
+                    ('hstracker_sql_seconds_total', 'sql_seconds', 'Time spent executing SQL statements.'),
+                    ('hstracker_db_connections_total', 'connections', 'Database connections used, summed over requests.')):
+                out.append(f'# HELP {name} {help_text}')
+                out.append(f'# TYPE {name} counter')
+                for (endpoint, method), s in items:
+                    out.append(f'{name}{{endpoint="{endpoint}",method="{method}"}} {s[key]}')
+            out.append('# HELP hstracker_slow_queries_total Statements slower than the slow-query threshold.')
+            out.append('# TYPE hstracker_slow_queries_total counter')
+            out.append(f'hstracker_slow_queries_total {self.slow_query_count}')
+        for metric in ('hits', 'misses', 'evictions', 'invalidations'):
+            out.append(f'# TYPE hstracker_cache_{metric}_total counter')
+            for name, cache in CACHES.items():
+                out.append(f'hstracker_cache_{metric}_total{{cache="{name}"}} {cache.stats()[metric]}')
+        return '\n'.join(out) + '\n'
+
+metrics = RequestMetrics()
+
+def _record_statement(conn, sql, seconds):
+    if has_request_context():
+        endpoint = request.endpoint
+        stats = g.get('sql_stats')
+    else:
+        # outside a request the running code labels its thread: the write
+        # queue (counting on behalf of the requests it commits for) or a
+        # streamed export still running after its request has ended
+        endpoint = getattr(_db_local, 'sql_label', None) or 'background'
+        stats = getattr(_db_local, 'write_stats', None)
+    if stats is not None:
+        stats['statements'] += 1
+        stats['seconds'] += seconds
+        stats['connections'].add(id(conn))
+    if seconds >= SLOW_QUERY_SECONDS:
+        metrics.slow_query(sql, seconds, endpoint)
+
+class TimedCursor(sqlite3.Cursor):
+    """Cursor that reports each statement's count and execution time to the request metrics.
+
+    The time covers executing the statement up to its first row; rows
+    fetched afterwards are not included.
+    """
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            _record_statement(self.connection, sql, time.perf_counter() - started)
+
+    def executemany(self, sql, seq_of_parameters):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            _record_statement(self.connection, sql, time.perf_counter() - started)
+
+class TimedConnection(sqlite3.Connection):
+    def cursor(self, factory=TimedCursor):
+        return super().cursor(factory)
+
+    # the C implementations would bypass TimedCursor
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+@app.before_request
+def _start_request_metrics():
+    g.request_started = time.perf_counter()
+    g.sql_stats = {'statements': 0, 'seconds': 0.0, 'connections': set()}
+
+@app.after_request
+def _record_request_metrics(response):
+    # streamed bodies (exports) are produced after this point and not timed
+    started = g.get('request_started')
+    if started is not None:
+        stats = g.sql_stats
+        metrics.observe(request.endpoint or 'unmatched', request.method, response.status_code,
+                        time.perf_counter() - started, stats['statements'], stats['seconds'],
+                        len(stats['connections']))
+    return response
+
+# ---- response compression ----------------------------------------
+GZIP_MIN_BYTES = int(os.environ.get('HSTRACKER_GZIP_MIN_BYTES', 1024))   # smaller bodies go as-is
+GZIP_LEVEL = 6
+GZIP_TYPES = {'application/json', 'application/x-ndjson', 'text/csv'}    # plus any +json type
+
+def _gzip_chunks(chunks):
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)   # wbits 31: gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode() if isinstance(chunk, str) else chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+@app.after_request
+def _compress_response(response):
+    """gzip JSON bodies and CSV/NDJSON exports for clients that accept it.
+
+    Buffered bodies under GZIP_MIN_BYTES are left alone; streamed exports
+    are compressed chunk by chunk as they are produced.  Registered after
+    the metrics hook, so it runs first and its time is measured.
+    """
+    if (response.status_code < 200 or response.status_code in (204, 304)
+            or response.direct_passthrough or 'Content-Encoding' in response.headers
+            or not (response.is_json or response.mimetype in GZIP_TYPES)):
+        return response
+    response.vary.add('Accept-Encoding')
+    if not request.accept_encodings['gzip']:
+        return response
+    if response.is_streamed:
+        response.response = _gzip_chunks(response.response)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < GZIP_MIN_BYTES:
+            return response
+        response.set_data(gzip.compress(data, GZIP_LEVEL))
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+def _open_db():
+    conn = sqlite3.connect(DATABASE, timeout=SQLITE_PRAGMAS['busy_timeout'] / 1000.0,
+                           factory=TimedConnection)
+    for name, value in SQLITE_PRAGMAS.items():
+        conn.execute(f'PRAGMA {name}={value}')
+    key = (os.getpid(), DATABASE)
+    if key not in _schema_checked:
+        created = ensure_schema(conn)
+        conn.commit()
+        if created:
+            log.info("Created indexes: %s", created)
+        _schema_checked.add(key)
+    return conn
+
+def get_db():
+    """Return this thread's connection to DATABASE, opening it on first use.
+
+    The connection is reused across requests served by the same thread (one
+    per gunicorn sync worker), and is reopened after a fork or if DATABASE
+    changes.  Use it as ``with get_db() as conn:`` to get the same
+    commit/rollback behaviour as ``with sqlite3.connect(...)``.
+    """
+    conn = getattr(_db_local, 'conn', None)
+    key = (os.getpid(), DATABASE)
+    if conn is None or _db_local.key != key:
+        conn = _open_db()
+        _db_local.conn, _db_local.key = conn, key
+    return conn
+
+def close_db():
+    conn = getattr(_db_local, 'conn', None)
+    if conn is not None:
+        conn.close()
+        _db_local.conn = None
+
+@app.teardown_request
+def _release_db(exc):
+    # never let a half-finished transaction leak into the next request
+    conn = getattr(_db_local, 'conn', None)
+    if conn is not None and conn.in_transaction:
+        conn.rollback()
+
+CACHES = {}     # name -> LRUCache, reported by /admin/cache-stats
+
+class LRUCache:
+    """Thread-safe, size-bounded LRU map with hit/miss/eviction counters.
+
+    Values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, name, maxsize):
+        self.name = name
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+        CACHES[name] = self
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def discard_where(self, predicate):
+        with self._lock:
+            stale = [key for key in self._data if predicate(key)]
+            for key in stale:
+                del self._data[key]
+            self.invalidations += len(stale)
+            return len(stale)
+
+    def clear(self):
+        self.discard_where(lambda key: True)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'size': len(self._data), 'maxsize': self.maxsize,
+                    'hits': self.hits, 'misses': self.misses,
+                    'hit_ratio': round(self.hits / lookups, 3) if lookups else None,
+                    'evictions': self.evictions, 'invalidations': self.invalidations}
+
+# Computed _get_weekly_progress_data() results, keyed by
+# (user_id, week Monday, selected weekday, cache versions at compute time)
+weekly_progress_cache = LRUCache(
+    'weekly_progress', int(os.environ.get('HSTRACKER_WEEKLY_CACHE_SIZE', 1024)))
+
+# Rarely-changing configuration (tier thresholds, tier messages, each
+# student's task definitions), keyed by (scope, cache version at load time)
+config_cache = LRUCache(
+    'config', int(os.environ.get('HSTRACKER_CONFIG_CACHE_SIZE', 512)))
+
+# This process's copy of the cache_versions table and the '*' generation it reflects
+_seen_versions = {'generation': None, 'scopes': {}}
+_seen_versions_lock = threading.Lock()
+
+def _cache_version_table():
+    """{scope: version} as committed by any worker, revalidated once per request.
+
+    Every bump also bumps the '*' generation row, so revalidating costs a
+    single primary-key read; the table itself is re-read only when some
+    worker has bumped a scope since this process last looked.
+    """
+    if has_request_context() and 'cache_versions' in g:
+        return g.cache_versions
+    c = get_db().cursor()
+    c.execute("SELECT version FROM cache_versions WHERE scope='*'")
+    row = c.fetchone()
+    generation = row[0] if row else 0
+    with _seen_versions_lock:
+        if generation != _seen_versions['generation']:
+            c.execute('SELECT scope, version FROM cache_versions')
+            _seen_versions['scopes'] = dict(c.fetchall())
+            _seen_versions['generation'] = generation
+        scopes = _seen_versions['scopes']
+    if has_request_context():
+        g.cache_versions = scopes
+    return scopes
+
+def get_cache_versions(*scopes):
+    """Current cache_versions counters for scopes, as a tuple in the same order."""
+    table = _cache_version_table()
+    return tuple(table.get(scope, 0) for scope in scopes)
+
+def bump_cache_version(cursor, scope):
+    """Retire cached copies of scope, here and (once committed) in every worker."""
+    cursor.executemany('''
+        INSERT INTO cache_versions(scope, version) VALUES (?, 1)
+        ON CONFLICT(scope) DO UPDATE SET version = version + 1
+    ''', [(scope,), ('*',)])
+    config_cache.discard_where(lambda key: key[0] == scope)
+    if has_request_context():
+        g.pop('cache_versions', None)   # later reads in this request see the bump
+
+def cached_config(cursor, scope, load):
+    """load(cursor), memoized in config_cache under scope's current version.
+
+    Results read while the connection is inside a transaction are not
+    stored, since they may include that transaction's uncommitted writes.
+    """
+    key = (scope, get_cache_versions(scope)[0])
+    value = config_cache.get(key)
+    if value is None:
+        value = load(cursor)
+        if not cursor.connection.in_transaction:
+            config_cache.put(key, value)
+    return value
+
+def invalidate_weekly_progress(cursor, user_id=None):
+    """Mark cached weekly progress stale for one student, or everyone if user_id is None.
+
+    Call with the cursor of the write transaction: the version bump commits
+    with the write, which is how other gunicorn workers notice it.
+    """
+    if user_id is None:
+        bump_cache_version(cursor, 'thresholds')
+        weekly_progress_cache.clear()
+    else:
+        bump_cache_version(cursor, f'progress:{user_id}')
+        weekly_progress_cache.discard_where(lambda key: key[0] == user_id)
+
+def versioned_json(scopes, build):
+    """JSON response for build(cursor), tagged with the scopes' versions as an ETag.
+
+    The ETag is derived from cache_versions alone, so a client whose
+    If-None-Match is still current gets a 304 without build() running
+    its queries or the body being serialized.  Writers bump the scope
+    with bump_cache_version in their own transaction.
+    """
+    etag = '-'.join(f'{scope}.{version}' for scope, version
+                    in zip(scopes, get_cache_versions(*scopes)))
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        with get_db() as conn:
+            response = jsonify(build(conn.cursor()))
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'   # always revalidate
+    return response
 
 def snake_case(s: str) -> str:
     # turn "My New Field" → "my_new_field"
@@ -21,7 +476,7 @@ def snake_case(s: str) -> str:
 
 def get_previous_day_data(user_id, date):
     prev_date = (datetime.strptime(date, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
-    with sqlite3.connect(DATABASE) as conn:
+    with get_db() as conn:
         c = conn.cursor()
         c.execute('''SELECT book_title, word_count, expected_weekly_reading_rate,
                      accumulated_reading_percent FROM daily_reports
@@ -34,142 +489,380 @@ def get_accumulated_weekly_reading_percent(user_id, date, daily_reading_percent)
     monday_date = date_obj - timedelta(days=date_obj.weekday())
     accumulated_percent = 0.0
 
-    with sqlite3.connect(DATABASE) as conn:
-        c = conn.cursor()
-        c.execute('''
-            SELECT SUM(daily_reading_percent) FROM daily_reports
-            WHERE user_id = ? AND date BETWEEN ? AND ?
-        ''', (user_id, monday_date.strftime('%Y-%m-%d'), date_obj.strftime('%Y-%m-%d')))
-        result = c.fetchone()
-        accumulated_percent = result[0] or 0.0
+    # no commit: /submit runs this inside the write queue's transaction
+    c = get_db().cursor()
+    c.execute('''
+        SELECT SUM(daily_reading_percent) FROM daily_reports
+        WHERE user_id = ? AND date BETWEEN ? AND ?
+    ''', (user_id, monday_date.strftime('%Y-%m-%d'), date_obj.strftime('%Y-%m-%d')))
+    result = c.fetchone()
+    accumulated_percent = result[0] or 0.0
 
     return accumulated_percent
 
+# carry_forward_state columns after (user_id, valid_from): each sticky field and its date
+CARRY_FORWARD_STATE_COLUMNS = [col for field in CARRY_FORWARD_FIELDS for col in (field, f'{field}_date')]
+
+# The interval in effect on a date: one descending seek on the primary key
+CARRY_FORWARD_LOOKUP_SQL = f'''
+    SELECT {', '.join(CARRY_FORWARD_STATE_COLUMNS)} FROM carry_forward_state
+     WHERE user_id=? AND valid_from <= ? ORDER BY valid_from DESC LIMIT 1'''
+
+# Whether the student ever saved a rate: the latest interval carries it forward
+RATE_EVER_SET_SQL = '''
+    SELECT expected_weekly_reading_rate IS NOT NULL FROM carry_forward_state
+     WHERE user_id=? ORDER BY valid_from DESC LIMIT 1'''
+
+# Fields returned by /last-known-data (and the bootstrap's lastKnownData).
+LAST_KNOWN_FIELDS = ['book_title', 'word_count', 'accumulated_reading_percent', 'expected_weekly_reading_rate']
+
+def get_last_explicit_fields(user_id, date, fields):
+    """Resolve the last explicitly saved value of each field on or before date.
+
+    Returns {field: (value, value_date)} for every requested field, with
+    (None, None) where nothing was ever saved.  fields must be sticky fields
+    (CARRY_FORWARD_FIELDS); all of them come from the one carry_forward_state
+    interval in effect on date.  Read-only, so it never commits and can run
+    inside a caller's read snapshot.
+    """
+    fields = list(dict.fromkeys(fields))
+    unknown = [field for field in fields if field not in CARRY_FORWARD_FIELDS]
+    if unknown:
+        raise ValueError(f"Not a carry-forward field: {unknown[0]!r}")
+    resolved = {field: (None, None) for field in fields}
+    if not fields:
+        return resolved
+
+    c = get_db().cursor()
+    c.execute(CARRY_FORWARD_LOOKUP_SQL, (user_id, date))
+    row = c.fetchone()
+    if row:
+        state = dict(zip(CARRY_FORWARD_STATE_COLUMNS, row))
+        for field in fields:
+            resolved[field] = (state[field], state[f'{field}_date'])
+
+    log.debug("fields %s, user_id %s, requested date %s, result: %s", fields, user_id, date, resolved)
+    return resolved
+
+def rate_ever_set(cursor, user_id):
+    """True once any of user_id's reports saved expected_weekly_reading_rate."""
+    cursor.execute(RATE_EVER_SET_SQL, (user_id,))
+    row = cursor.fetchone()
+    return bool(row and row[0])
+
+def refresh_carry_forward(cursor, user_id, start, end=None):
+    """Bring user_id's carry_forward_state up to date after writing reports from start to end.
+
+    The intervals in [start, end] are rebuilt from daily_reports, seeded by
+    the interval before start.  A later interval only changes where it still
+    carries a field's value from on or before end, so for each field whose
+    value at end changed, those intervals are updated in place: a back-dated
+    edit touches the intervals up to the field's next save, not the rest of
+    the history.
+    """
+    end = end or start
+    cursor.execute(CARRY_FORWARD_LOOKUP_SQL, (user_id, end))
+    empty = [None] * len(CARRY_FORWARD_STATE_COLUMNS)
+    before = list(cursor.fetchone() or empty)
+    cursor.execute('DELETE FROM carry_forward_state WHERE user_id=? AND valid_from BETWEEN ? AND ?',
+                   (user_id, start, end))
+    cursor.execute(CARRY_FORWARD_LOOKUP_SQL, (user_id, start))
+    state = list(cursor.fetchone() or empty)
+    cursor.execute(f'''
+        SELECT date, {', '.join(CARRY_FORWARD_FIELDS)} FROM daily_reports
+         WHERE user_id=? AND date BETWEEN ? AND ?
+           AND ({' OR '.join(f'{field} IS NOT NULL' for field in CARRY_FORWARD_FIELDS)})
+         ORDER BY date
+    ''', (user_id, start, end))
+    intervals = []
+    for date, *values in cursor.fetchall():
+        for i, value in enumerate(values):
+            if value is not None:
+                state[2 * i:2 * i + 2] = value, date
+        intervals.append((user_id, date, *state))
+    cursor.executemany(f'''
+        INSERT INTO carry_forward_state (user_id, valid_from, {', '.join(CARRY_FORWARD_STATE_COLUMNS)})
+        VALUES ({', '.join('?' * (2 + len(CARRY_FORWARD_STATE_COLUMNS)))})
+    ''', intervals)
+    for i, field in enumerate(CARRY_FORWARD_FIELDS):
+        if state[2 * i:2 * i + 2] != before[2 * i:2 * i + 2]:
+            cursor.execute(f'''
+                UPDATE carry_forward_state SET {field}=?, {field}_date=?
+                 WHERE user_id=? AND valid_from > ? AND ({field}_date IS NULL OR {field}_date <= ?)
+            ''', (*state[2 * i:2 * i + 2], user_id, end, end))
+
+def rebuild_carry_forward(cursor):
+    """Recompute every student's carry_forward_state (backfill); returns the intervals."""
+    cursor.execute('DELETE FROM carry_forward_state')
+    return fill_carry_forward_state(cursor)
+
+def expected_daily_reading_percent(rate, word_count):
+    """Stored expected_daily_reading_percent for a weekly word rate and book length."""
+    if rate is None or word_count is None or word_count <= 0:
+        return None
+    raw_percent_for_storage = (100.0 * rate / word_count) / 7.0
+    # If you want to store it rounded to an INTEGER with "round half up":
+    # return int(raw_percent_for_storage + 0.5)
+    return round(raw_percent_for_storage, 2)
+
 def get_last_explicit_field_value(user_id, date, field_name):
-    with sqlite3.connect(DATABASE) as conn:
-        c = conn.cursor()
-        c.execute(f'''
-            SELECT {field_name}, date FROM daily_reports
-            WHERE user_id=? AND {field_name} IS NOT NULL AND date <= ?
-            ORDER BY date DESC LIMIT 1
-        ''', (user_id, date))
-        result = c.fetchone()
-
-        print(f"DEBUG: field {field_name}, user_id {user_id}, requested date {date}, result: {result}")
-
-        # Verify explicitly set value is on or before the requested date
-        if result:
-            explicit_date = datetime.strptime(result[1], '%Y-%m-%d')
-            requested_date = datetime.strptime(date, '%Y-%m-%d')
-            if explicit_date <= requested_date:
-                return result[0]
-    return None
+    return get_last_explicit_fields(user_id, date, [field_name])[field_name][0]
 
 def get_last_explicit_field_date(user_id, date, field_name):
-    with sqlite3.connect(DATABASE) as conn:
-        c = conn.cursor()
-        c.execute(f'''
-            SELECT date FROM daily_reports
-            WHERE user_id=? AND {field_name} IS NOT NULL AND date <= ?
-            ORDER BY date DESC LIMIT 1
-        ''', (user_id, date))
-        result = c.fetchone()
-    return result[0] if result else None
-
-def _get_weekly_progress_data(user_id, date_str):
-    try:
-        d = datetime.strptime(date_str, '%Y-%m-%d')
-    except ValueError: return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
-    
-    WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
-    FULL_WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
-    monday = d - timedelta(days=(d.weekday()))
-    sunday = monday + timedelta(days=6)
-    day_before_monday = monday - timedelta(days=1)
-
-    def get_full_plan(cursor, student_id, text_task_slugs):
-        plan_data = {'expected_math_points': {}}
-        # Initialize plan for text tasks
-        for slug in text_task_slugs:
-            plan_data[slug] = {}
-
-        slugs_to_query = ['expected_math_points'] + list(text_task_slugs)
-        placeholders = ','.join('?' * len(slugs_to_query)) # Create placeholders for query
-
-        cursor.execute(f'''
-            SELECT te.day_of_week, td.slug, te.value
-            FROM task_entries te JOIN task_definitions td ON td.id = te.task_def_id
-            WHERE te.student_id=? AND td.slug IN ({placeholders})
-        ''', [student_id] + slugs_to_query) # Pass parameters correctly
-
-        for day, slug, val in cursor.fetchall():
-            day_plan = plan_data.get(slug, {}) # Get plan for this slug
-             # Store plan value (check if it's non-empty for text tasks)
-            is_planned = False
-            if slug == 'expected_math_points':
-                 try:
-                     day_plan[day] = int(val) if val is not None else 0
-                 except (ValueError, TypeError):
-                     day_plan[day] = 0
-            else: # Text task
-                day_plan[day] = str(val or '').strip() # Store the text plan value
-                is_planned = day_plan[day] != '' # Planned if text is not empty
-            plan_data[slug] = day_plan # Update plan for this slug
-        return plan_data
-
-    with sqlite3.connect(DATABASE) as conn:
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-
-
-        # --- Fetch ALL slugs defined for the student ---
-        c.execute("SELECT slug, label, field_type, is_default FROM task_definitions WHERE student_id=? AND (is_active=1 OR is_default=1) ORDER BY created_at", (user_id,))
-        all_defs = c.fetchall()
-        # Separate text slugs for later check
-        text_task_defs = {row['slug']: row['label'] for row in all_defs if row['field_type'] == 'text' and not row['is_default']} # Only custom text tasks
-        # --- ADD PRINT STATEMENT BELOW THIS LINE ---
-        print(f"DEBUG (get_weekly_progress): Found text task defs: {text_task_defs}")
-
-        plan = get_full_plan(c, user_id, text_task_defs.keys())
-        math_plan = plan.get('expected_math_points', {})
-
-        # --- Build field list dynamically including text slugs ---
-        fields_to_select = ['date', 'actual_math_points', 'math_time', 'accumulated_reading_percent',
-                           'word_count', 'expected_weekly_reading_rate', 'book_title']
-        # Add text task slugs safely quoted
-        fields_to_select.extend([f'"{slug}"' for slug in text_task_defs.keys()])
-        select_clause = ', '.join(fields_to_select)
-
-        # --- ADD PRINT STATEMENT BELOW THIS LINE ---
-        print(f"DEBUG (get_weekly_progress): SELECT clause built: {select_clause}")
-
-        c.execute(f'''
-          SELECT {select_clause}
-            FROM daily_reports
-           WHERE user_id=? AND date BETWEEN ? AND ?
-           ORDER BY date ASC
-        ''', (user_id, monday.strftime('%Y-%m-%d'), sunday.strftime('%Y-%m-%d')))
-        daily_reports = {r['date']: dict(r) for r in c.fetchall()}
-
-        # Fetch context from day before Monday
+    return get_last_explicit_fields(user_id, date, [field_name])[field_name][1]
+
+WEEKDAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
+FULL_WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+CALENDAR_MEMO_SIZE = 100000     # dates kept per memo before it is cleared
+
+class DayCalendar:
+    """Memoized 'YYYY-MM-DD' <-> day-ordinal conversions and week lookups.
+
+    Ordinals are date.toordinal(), the numbers stored in
+    daily_reports.day_ordinal.  Day 1 (0001-01-01) was a Monday, so a day's
+    weekday, Monday and Sunday are plain integer arithmetic, and each date
+    is parsed or formatted once per process instead of once per use.
+    """
+    def __init__(self):
+        self._ordinals = {}      # 'YYYY-MM-DD' -> ordinal
+        self._dates = {}         # ordinal -> 'YYYY-MM-DD'
+        self._weeks = {}         # Monday ordinal -> ((date, 'Monday', 'Mon'), ...)
+
+    @staticmethod
+    def _remember(memo, key, value):
+        if len(memo) >= CALENDAR_MEMO_SIZE:
+            memo.clear()
+        memo[key] = value
+        return value
+
+    def ordinal(self, date_str):
+        """Day ordinal of a 'YYYY-MM-DD' string; ValueError (from strptime) for anything else."""
+        ordinal = self._ordinals.get(date_str)
+        if ordinal is None:
+            ordinal = self._remember(self._ordinals, date_str,
+                                     datetime.strptime(date_str, '%Y-%m-%d').toordinal())
+        return ordinal
+
+    def iso(self, ordinal):
+        """'YYYY-MM-DD' of a day ordinal."""
+        date_str = self._dates.get(ordinal)
+        if date_str is None:
+            date_str = self._remember(self._dates, ordinal, datetime.fromordinal(ordinal).strftime('%Y-%m-%d'))
+        return date_str
+
+    @staticmethod
+    def weekday(ordinal):
+        """0 for Monday ... 6 for Sunday."""
+        return (ordinal - 1) % 7
+
+    @staticmethod
+    def monday(ordinal):
+        return ordinal - (ordinal - 1) % 7
+
+    @staticmethod
+    def sunday(ordinal):
+        return ordinal - (ordinal - 1) % 7 + 6
+
+    def week(self, monday):
+        """(date, full weekday, short weekday) for each day of the week starting at ordinal monday."""
+        days = self._weeks.get(monday)
+        if days is None:
+            days = self._remember(self._weeks, monday, tuple(
+                (self.iso(monday + i), FULL_WEEKDAYS[i], WEEKDAYS[i]) for i in range(7)))
+        return days
+
+day_calendar = DayCalendar()
+
+def student_definitions(cursor, student_id):
+    """Every task definition of a student, cached per process.
+
+    Tuples of (id, slug, label, field_type, readonly, is_default, is_active),
+    ordered is_default DESC, created_at, id.
+    """
+    def load(c):
         c.execute('''
-            SELECT accumulated_reading_percent, book_title,
-                   word_count, expected_weekly_reading_rate
-            FROM daily_reports
-            WHERE user_id = ? AND date <= ?
-            ORDER BY date DESC LIMIT 1 ''',
-            (user_id, day_before_monday.strftime('%Y-%m-%d')))
-        prev_context_row = c.fetchone()
-        
-        prev_read = prev_context_row['accumulated_reading_percent'] if prev_context_row else 0
-        if prev_read is None:
-            prev_read = 0
-        prev_title = prev_context_row['book_title'] if prev_context_row else None
-        current_applicable_rate = prev_context_row['expected_weekly_reading_rate'] if prev_context_row else None
-        current_applicable_count = prev_context_row['word_count'] if prev_context_row else None
-        if current_applicable_rate is None:
-            c.execute("SELECT 1 FROM daily_reports WHERE user_id = ? AND expected_weekly_reading_rate IS NOT NULL LIMIT 1", (user_id,))
-            if not c.fetchone(): current_applicable_rate = 35000
+          SELECT id, slug, label, field_type, readonly, is_default, is_active
+            FROM task_definitions
+           WHERE student_id=?
+           ORDER BY is_default DESC, created_at, id
+        ''', (student_id,))
+        return tuple(tuple(row) for row in c.fetchall())
+    return cached_config(cursor, f'definitions:{student_id}', load)
+
+# Task slugs stored as daily_reports columns (the default definitions); every
+# other slug's daily values live in daily_task_values
+REPORT_COLUMNS = DAILY_REPORT_BASE_COLUMNS - {'id', 'user_id', 'date'}
+
+def _stored_task_value(field_type, value):
+    """value as a per-slug column of that type used to store it (TEXT / INTEGER affinity)."""
+    if value is None:
+        return None
+    if field_type == 'text':
+        return str(value)
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+def _task_values(cursor, user_id, start, end, slugs=None):
+    """{date: {slug: value}} of user_id's custom task values between start and end."""
+    slug_of = {row[0]: row[1] for row in student_definitions(cursor, user_id)}
+    cursor.execute('''
+        SELECT dr.date, v.task_def_id, v.value
+          FROM daily_reports dr
+          JOIN daily_task_values v ON v.report_id = dr.id
+         WHERE dr.user_id=? AND dr.date BETWEEN ? AND ?
+    ''', (user_id, start, end))
+    values = {}
+    for date, task_def_id, value in cursor.fetchall():
+        slug = slug_of.get(task_def_id)
+        if slug is not None and (slugs is None or slug in slugs):
+            values.setdefault(date, {})[slug] = value
+    return values
+
+def save_task_values(cursor, user_id, reports):
+    """Replace the custom task values of user_id's (already saved) daily reports.
+
+    reports maps date -> {slug: value}.  Slugs stored as daily_reports
+    columns are ignored and None values are not stored, so each report
+    costs one row per custom task the student actually filled in.
+    """
+    if not reports:
+        return
+    defs = {row[1]: (row[0], row[3]) for row in student_definitions(cursor, user_id)
+            if row[1] not in REPORT_COLUMNS}
+    dates = sorted(reports)
+    cursor.execute('SELECT date, id FROM daily_reports WHERE user_id=? AND date BETWEEN ? AND ?',
+                   (user_id, dates[0], dates[-1]))
+    report_ids = {date: report_id for date, report_id in cursor.fetchall()}
+    cursor.executemany('DELETE FROM daily_task_values WHERE report_id=?',
+                       [(report_ids[date],) for date in dates])
+    cursor.executemany('INSERT INTO daily_task_values (report_id, task_def_id, value) VALUES (?, ?, ?)', [
+        (report_ids[date], defs[slug][0], _stored_task_value(defs[slug][1], value))
+        for date in dates for slug, value in reports[date].items()
+        if slug in defs and value is not None])
+
+def _load_text_task_defs(cursor, student_id):
+    # --- Fetch ALL slugs defined for the student ---
+    all_defs = student_definitions(cursor, student_id)
+    # Separate text slugs for later check (custom defs keep created_at, id order)
+    text_task_defs = {slug: label for _, slug, label, field_type, _, is_default, is_active in all_defs
+                      if field_type == 'text' and not is_default and is_active} # Only custom text tasks
+    log.debug("get_weekly_progress: found text task defs: %s", text_task_defs)
+    return text_task_defs
+
+def get_full_plan(cursor, student_id, text_task_slugs):
+    slugs_to_query = ['expected_math_points'] + list(text_task_slugs)
+    placeholders = ','.join('?' * len(slugs_to_query)) # Create placeholders for query
+
+    cursor.execute(f'''
+        SELECT te.day_of_week, td.slug, te.value
+        FROM task_entries te JOIN task_definitions td ON td.id = te.task_def_id
+        WHERE te.student_id=? AND td.slug IN ({placeholders})
+    ''', [student_id] + slugs_to_query) # Pass parameters correctly
+    return _plan_from_rows(cursor.fetchall(), text_task_slugs)
+
+def _plan_from_rows(rows, text_task_slugs):
+    """{slug: {weekday: planned value}} from (day_of_week, slug, value) task_entries rows."""
+    plan_data = {'expected_math_points': {}}
+    # Initialize plan for text tasks
+    for slug in text_task_slugs:
+        plan_data[slug] = {}
+
+    for day, slug, val in rows:
+        if slug not in plan_data:
+            continue
+        day_plan = plan_data.get(slug, {}) # Get plan for this slug
+         # Store plan value (check if it's non-empty for text tasks)
+        if slug == 'expected_math_points':
+             try:
+                 day_plan[day] = int(val) if val is not None else 0
+             except (ValueError, TypeError):
+                 day_plan[day] = 0
+        else: # Text task
+            day_plan[day] = str(val or '').strip() # Store the text plan value
+        plan_data[slug] = day_plan # Update plan for this slug
+    return plan_data
+
+def load_thresholds(cursor):
+    def load(c):
+        c.execute('SELECT needs_work_max, good_max FROM tier_thresholds WHERE id=1')
+        row = c.fetchone() or (0.88, 0.98)          # very first run safety-net
+        return row[0], row[1]
+    return cached_config(cursor, 'thresholds', load)
+
+def _reading_context_before(cursor, user_id, day_before_monday):
+    """Reading context (prev_read, prev_title, rate, count) going into a Monday.
+
+    day_before_monday is a day ordinal.
+    """
+    # Fetch context from day before Monday
+    cursor.execute('''
+        SELECT accumulated_reading_percent, book_title,
+               word_count, expected_weekly_reading_rate
+        FROM daily_reports
+        WHERE user_id = ? AND day_ordinal <= ?
+        ORDER BY day_ordinal DESC LIMIT 1 ''',
+        (user_id, day_before_monday))
+    row = cursor.fetchone()
+    prev_context_row = dict(zip(('accumulated_reading_percent', 'book_title', 'word_count',
+                                 'expected_weekly_reading_rate'), row)) if row else None
+
+    return _context_from_row(prev_context_row, lambda: rate_ever_set(cursor, user_id))
+
+def _context_from_row(prev_context_row, rate_ever_set):
+    """Reading context from the last daily_reports row before a Monday (or None).
+
+    rate_ever_set is only called when that row has no rate; if the student
+    never saved one, the 35000 default applies.
+    """
+    prev_read = prev_context_row['accumulated_reading_percent'] if prev_context_row else 0
+    if prev_read is None:
+        prev_read = 0
+    prev_title = prev_context_row['book_title'] if prev_context_row else None
+    current_applicable_rate = prev_context_row['expected_weekly_reading_rate'] if prev_context_row else None
+    current_applicable_count = prev_context_row['word_count'] if prev_context_row else None
+    if current_applicable_rate is None:
+        if not rate_ever_set(): current_applicable_rate = 35000
+    return {'prev_read': prev_read, 'prev_title': prev_title,
+            'rate': current_applicable_rate, 'count': current_applicable_count}
+
+# daily_reports columns weekly progress reads
+WEEKLY_ROW_FIELDS = ['date', 'actual_math_points', 'math_time', 'accumulated_reading_percent',
+                     'word_count', 'expected_weekly_reading_rate', 'book_title', 'day_ordinal']
+
+def _weekly_rows(cursor, user_id, start, end, text_task_defs):
+    """daily_reports rows (dicts, date order) between day ordinals start and end as weekly progress reads them.
+
+    Each row also carries the day's value of every text task in
+    text_task_defs under its slug.
+    """
+    cursor.execute(f'''
+      SELECT {', '.join(WEEKLY_ROW_FIELDS)}
+        FROM daily_reports
+       WHERE user_id=? AND day_ordinal BETWEEN ? AND ?
+       ORDER BY day_ordinal ASC
+    ''', (user_id, start, end))
+    rows = [dict(zip(WEEKLY_ROW_FIELDS, r)) for r in cursor.fetchall()]
+    if text_task_defs:
+        values = _task_values(cursor, user_id, day_calendar.iso(start), day_calendar.iso(end), text_task_defs)
+        for row in rows:
+            row.update(values.get(row['date'], {}))
+    return rows
+
+def _compute_week_progress(d, daily_reports, plan, text_task_defs, reading, thresholds):
+    """Weekly progress and effort for the week containing d, as of d.
+
+    daily_reports maps 'YYYY-MM-DD' -> row dict for that week.  reading holds
+    the reading context going into Monday (prev_read, prev_title, rate,
+    count); returns (response_data, reading context at the end of Sunday).
+    """
+    monday = d - timedelta(days=(d.weekday()))
+    math_plan = plan.get('expected_math_points', {})
+    prev_read = reading['prev_read']
+    prev_title = reading['prev_title']
+    current_applicable_rate = reading['rate']
+    current_applicable_count = reading['count']
 
     # Initialize weekly totals
     total_actual_math_points = 0
@@ -181,18 +874,13 @@ def _get_weekly_progress_data(user_id, date_str):
     text_task_completion = {slug: {day: False for day in ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']}
                            for slug in text_task_defs.keys()}
     # --- ADD PRINT STATEMENT BELOW THIS LINE ---
-    print(f"DEBUG (get_weekly_progress): Initialized completion tracker: {text_task_completion}")
+    log.debug("get_weekly_progress: initialized completion tracker: %s", text_task_completion)
     # --- End Initialize ---
 
     daily_data_out = []
     running_expect_math = running_expect_read = running_plan_tasks = 0
 
-    for i in range(7):
-        current = monday + timedelta(days=i)
-        date_str = current.strftime('%Y-%m-%d')
-        weekday_full = current.strftime('%A')
-        weekday_short = current.strftime('%a')
-
+    for i, (date_str, weekday_full, weekday_short) in enumerate(day_calendar.week(monday.toordinal())):
         report_data = daily_reports.get(date_str, {})
 
         # Extract actuals
@@ -256,7 +944,7 @@ def _get_weekly_progress_data(user_id, date_str):
         total_expected_reading_percent += exp_read_percent
 
         # Get running values of expected achievements for Mon to selected day
-        if current <= d:                       # only Mon-to-selected-day
+        if i <= d.weekday():                   # only Mon-to-selected-day
             running_expect_math  += exp_pts
             running_expect_read  += exp_read_percent
             running_plan_tasks   += sum(1 for slug in text_task_defs if plan.get(slug, {}).get(weekday_full, '').strip())
@@ -340,12 +1028,7 @@ def _get_weekly_progress_data(user_id, date_str):
     parts = [p for p in (math_pct, read_pct, tasks_pct) if p is not None]
     overall_pct = round(sum(parts)/len(parts),3) if parts else None
 
-    def load_thresholds(cursor):
-        cursor.execute('SELECT needs_work_max, good_max FROM tier_thresholds WHERE id=1')
-        row = cursor.fetchone() or (0.88, 0.98)          # very first run safety-net
-        return row[0], row[1]
-
-    needs_work_max, good_max = load_thresholds(c)
+    needs_work_max, good_max = thresholds
     
     def tier(p):            # thresholds
         if p is None: return 'noData'
@@ -380,42 +1063,566 @@ def _get_weekly_progress_data(user_id, date_str):
     # Sunday “near-miss” nudge
     excellent_cutoff = good_max
     if scope=='final' and effort["tier"]=='good' and (excellent_cutoff - overall_pct) <= NEAR_MISS_DELTA:
-        weakest = min({'math':math_pct,'reading':read_pct,'tasks':tasks_pct},
-                      key=lambda k: {'math':math_pct,'reading':read_pct,'tasks':tasks_pct}[k])
-        effort["nudge"] = f"Finish your {weakest} goal and you’ll hit 100 %!"
+        # parts without a goal this week (no text tasks, no plan) have no pct
+        parts = {k: v for k, v in {'math':math_pct,'reading':read_pct,'tasks':tasks_pct}.items()
+                 if v is not None}
+        if parts:
+            weakest = min(parts, key=parts.get)
+            effort["nudge"] = f"Finish your {weakest} goal and you’ll hit 100 %!"
 
     response_data["summary"]["effort"] = effort 
     response_data["effort"] = effort
 
-    # Admin reward hook ..   
-    if scope == 'final' and overall_pct is not None:
-        try:
-            with sqlite3.connect(DATABASE) as conn:
-                c = conn.cursor()
-                c.execute('''
-                    INSERT OR REPLACE INTO weekly_results
-                           (user_id, week, pct, tier)
-                    VALUES (?, ?, ?, ?)
-                ''', (
-                    user_id,
-                    monday.strftime('%Y-%m-%d'),   # store the Monday that starts the week
-                    overall_pct,
-                    effort["tier"]
-                ))
-                conn.commit()
-        except Exception as e:
-            # log but never crash the API
-            print(f"[weekly_results] failed to save result: {e}")
+    reading_out = {'prev_read': prev_read, 'prev_title': prev_title,
+                   'rate': current_applicable_rate, 'count': current_applicable_count}
+    return response_data, reading_out
+
+def _get_weekly_progress_data(user_id, date_str, text_task_defs=None, thresholds=None):
+    """Weekly progress for the week containing date_str, as of date_str.
+
+    Callers that already hold the student's text task definitions or the
+    thresholds can pass them in.  Read-only: the reads share the caller's
+    snapshot when run inside /bootstrap.
+    """
+    try:
+        ordinal = day_calendar.ordinal(date_str)
+    except ValueError: return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+    
+    monday = day_calendar.monday(ordinal)
+
+    cache_key = (user_id, day_calendar.iso(monday), day_calendar.weekday(ordinal),
+                 get_cache_versions(f'progress:{user_id}', 'thresholds'))
+    cached = weekly_progress_cache.get(cache_key)
+    if cached is not None:
+        return cached
 
+    c = get_db().cursor()
+    c.row_factory = sqlite3.Row
+
+    if text_task_defs is None:
+        text_task_defs = _load_text_task_defs(c, user_id)
+    plan = get_full_plan(c, user_id, text_task_defs.keys())
+    daily_reports = {r['date']: r for r in _weekly_rows(c, user_id, monday, monday + 6, text_task_defs)}
+
+    reading = _reading_context_before(c, user_id, monday - 1)
+    if thresholds is None:
+        thresholds = load_thresholds(c)
+
+    response_data, _ = _compute_week_progress(datetime.fromordinal(ordinal), daily_reports, plan,
+                                              text_task_defs, reading, thresholds)
+
+    # weekly_results (the admin reward hook) is maintained on the write path
+    # by refresh_weekly_aggregates, so viewing a Sunday no longer writes it
+    weekly_progress_cache.put(cache_key, response_data)
     return response_data
 
+def _get_weekly_progress_range(user_id, start_str, end_str):
+    """Weekly progress for every week from start_str's week to end_str's week.
+
+    Definitions, plan and thresholds are read once and daily_reports is
+    scanned once in date order.  Like _weekly_finals, each week's reading
+    context comes from the last report before its Monday (taken from the
+    same scan), so every week matches /weekly-progress for the same day.
+    Each week is evaluated as of its Sunday, or as of end_str for the last
+    week.  Nothing is written to weekly_results.
+    """
+    start = day_calendar.ordinal(start_str)
+    end = day_calendar.ordinal(end_str)
+    if end < start:
+        raise ValueError("End date must not be before start date.")
+    first_monday = day_calendar.monday(start)
+    last_monday = day_calendar.monday(end)
+    if (last_monday - first_monday) // 7 + 1 > MAX_RANGE_WEEKS:
+        raise ValueError(f"Date range may span at most {MAX_RANGE_WEEKS} weeks.")
+
+    weeks = []
+    with get_db() as conn:
+        c = conn.cursor()
+        c.row_factory = sqlite3.Row
+
+        text_task_defs = _load_text_task_defs(c, user_id)
+        plan = get_full_plan(c, user_id, text_task_defs.keys())
+        thresholds = load_thresholds(c)
+        c.execute('''
+            SELECT accumulated_reading_percent, book_title,
+                   word_count, expected_weekly_reading_rate
+            FROM daily_reports
+            WHERE user_id = ? AND day_ordinal < ?
+            ORDER BY day_ordinal DESC LIMIT 1 ''', (user_id, first_monday))
+        row = c.fetchone()
+        last_row = dict(row) if row else None
+
+        ever_set = []
+        def rate_was_set():
+            if not ever_set:
+                ever_set.append(rate_ever_set(c, user_id))
+            return ever_set[0]
+
+        rows = _weekly_rows(c, user_id, first_monday, last_monday + 6, text_task_defs)
+
+        i = 0
+        for monday in range(first_monday, last_monday + 1, 7):
+            week_reports = {}
+            while i < len(rows) and rows[i]['day_ordinal'] <= monday + 6:
+                week_reports[rows[i]['date']] = rows[i]
+                i += 1
+
+            as_of = min(monday + 6, end)
+            reading = _context_from_row(last_row, rate_was_set)
+            week_data, _ = _compute_week_progress(
+                datetime.fromordinal(as_of), week_reports, plan, text_task_defs, reading, thresholds)
+            weeks.append({'week': day_calendar.iso(monday),
+                          'date': day_calendar.iso(as_of), **week_data})
+            if week_reports:
+                last_row = week_reports[max(week_reports)]
+
+    return {'start': start_str, 'end': end_str, 'weeks': weeks}
+
+def _week_monday(date_str):
+    return datetime.fromordinal(day_calendar.monday(day_calendar.ordinal(date_str)))
+
+def _weekly_finals(cursor, user_id, first_monday, last_monday):
+    """End-of-week progress for every week from first_monday to last_monday.
+
+    Each week matches _get_weekly_progress_data for its Sunday (reading
+    context from the last row before its Monday), but definitions, plan and
+    thresholds are read once and daily_reports is scanned once.
+    Returns [(monday, response_data), ...]; response_data is None for a week
+    that could not be computed (logged), so one bad week does not fail the
+    write that triggered the refresh.
+    """
+    text_task_defs = _load_text_task_defs(cursor, user_id)
+    plan = get_full_plan(cursor, user_id, text_task_defs.keys())
+    thresholds = load_thresholds(cursor)
+
+    first, last = first_monday.toordinal(), last_monday.toordinal()
+    cursor.execute('''
+        SELECT accumulated_reading_percent, book_title,
+               word_count, expected_weekly_reading_rate
+        FROM daily_reports
+        WHERE user_id = ? AND day_ordinal < ?
+        ORDER BY day_ordinal DESC LIMIT 1 ''', (user_id, first))
+    row = cursor.fetchone()
+    last_row = dict(zip(('accumulated_reading_percent', 'book_title', 'word_count',
+                         'expected_weekly_reading_rate'), row)) if row else None
+
+    ever_set = []
+    def rate_was_set():
+        if not ever_set:
+            ever_set.append(rate_ever_set(cursor, user_id))
+        return ever_set[0]
+
+    rows = _weekly_rows(cursor, user_id, first, last + 6, text_task_defs)
+
+    finals, i = [], 0
+    for monday in range(first, last + 1, 7):
+        week_reports = {}
+        while i < len(rows) and rows[i]['day_ordinal'] <= monday + 6:
+            week_reports[rows[i]['date']] = rows[i]
+            i += 1
+        reading = _context_from_row(last_row, rate_was_set)
+        try:
+            week_data, _ = _compute_week_progress(datetime.fromordinal(monday + 6), week_reports, plan,
+                                                  text_task_defs, reading, thresholds)
+        except Exception:
+            log.exception("Weekly progress failed for user %s, week of %s",
+                          user_id, day_calendar.iso(monday))
+            week_data = None
+        finals.append((datetime.fromordinal(monday), week_data))
+        if week_reports:
+            last_row = week_reports[max(week_reports)]
+    return finals
+
+def refresh_weekly_aggregates(cursor, user_id, from_monday=None, to_monday=None):
+    """Recompute weekly_aggregates and weekly_results for a student's weeks.
+
+    Covers every completed week (its Sunday before today) from the first
+    week with a daily report, optionally narrowed to [from_monday,
+    to_monday]; rows of weeks not yet completed are removed, so the
+    in-progress week never shows up as a final result.  Runs on the caller's
+    cursor so it commits (or rolls back) with the write that triggered it.
+    Returns the number of weeks written.
+    """
+    final = _last_completed_monday()
+    cursor.execute('DELETE FROM weekly_aggregates WHERE user_id=? AND week>?',
+                   (user_id, final.strftime('%Y-%m-%d')))
+    cursor.execute('DELETE FROM weekly_results WHERE user_id=? AND week>?',
+                   (user_id, final.strftime('%Y-%m-%d')))
+    cursor.execute('SELECT MIN(date) FROM daily_reports WHERE user_id=?', (user_id,))
+    first = cursor.fetchone()[0]
+    if first is None:
+        return 0
+    lo = max(_week_monday(first), from_monday or _week_monday(first))
+    hi = min(final, to_monday or final)
+    if lo > hi:
+        return 0
+
+    aggregates, results, no_result, failed = [], [], [], []
+    for monday, data in _weekly_finals(cursor, user_id, lo, hi):
+        week = monday.strftime('%Y-%m-%d')
+        if data is None:
+            # drop the week's stored rows rather than keep stale ones
+            failed.append((user_id, week))
+            continue
+        summary, effort, text_tasks = data['summary'], data['effort'], data['textTasks']
+        tasks = {slug: {'planned': sum(1 for v in text_tasks['plan'].get(slug, {}).values() if str(v).strip()),
+                        'done': sum(1 for done in text_tasks['completion'][slug].values() if done)}
+                 for slug in text_tasks['labels']}
+        aggregates.append((
+            user_id, week,
+            summary['total_actual_math_points'], summary['total_expected_math_points'],
+            summary['total_actual_reading_percent'], summary['total_expected_reading_percent'],
+            json.dumps(tasks), effort['math_pct'], effort['reading_pct'], effort['tasks_pct'],
+            effort['overall_pct'], effort['tier']))
+        if effort['overall_pct'] is not None:
+            results.append((user_id, week, effort['overall_pct'], effort['tier']))
+        else:
+            no_result.append((user_id, week))
+
+    cursor.executemany('''
+        INSERT OR REPLACE INTO weekly_aggregates
+            (user_id, week, math_actual, math_expected, reading_actual, reading_expected,
+             tasks, math_pct, reading_pct, tasks_pct, overall_pct, tier)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ''', aggregates)
+    cursor.executemany('''
+        INSERT OR REPLACE INTO weekly_results
+               (user_id, week, pct, tier)
+        VALUES (?, ?, ?, ?)
+    ''', results)
+    cursor.executemany('DELETE FROM weekly_results WHERE user_id=? AND week=?', no_result + failed)
+    cursor.executemany('DELETE FROM weekly_aggregates WHERE user_id=? AND week=?', failed)
+    return len(aggregates)
+
+def _last_completed_monday():
+    """Monday of the last week whose Sunday is before today."""
+    return datetime.fromordinal(day_calendar.monday(datetime.now().toordinal()) - 7)
+
+def refresh_weekly_aggregates_for_write(cursor, user_id, date, last_date=None):
+    """Refresh the weeks daily reports written on date (through last_date) can change.
+
+    That is their own weeks, plus every following week up to the one holding
+    the student's next report, or through the last completed week after
+    their last one (their reading context may now come from the written
+    rows), plus any weeks completed since the last materialized one.
+    """
+    last_date = last_date or date
+    cursor.execute('SELECT MAX(week) FROM weekly_aggregates WHERE user_id=?', (user_id,))
+    stored = cursor.fetchone()[0]
+    cursor.execute('SELECT MIN(date) FROM daily_reports WHERE user_id=? AND date > ?', (user_id, last_date))
+    next_date = cursor.fetchone()[0]
+
+    monday = _week_monday(date)
+    from_monday = min(_week_monday(stored) + timedelta(days=7), monday) if stored else None
+    behind = stored is None or _week_monday(stored) < _last_completed_monday()
+    to_monday = _week_monday(next_date) if next_date and not behind else None
+    return refresh_weekly_aggregates(cursor, user_id, from_monday, to_monday)
+
+def rebuild_weekly_aggregates(cursor):
+    """Recompute every student's weekly aggregates (e.g. after a threshold change)."""
+    cursor.execute('SELECT DISTINCT user_id FROM daily_reports')
+    return sum(refresh_weekly_aggregates(cursor, user_id) for (user_id,) in cursor.fetchall())
+
+BOOK_FORECAST_COLUMNS = ['user_id', 'book_title', 'started_on', 'as_of', 'percent', 'word_count',
+                         'weekly_rate', 'recent_pace', 'planned_pace', 'projected_finish',
+                         'planned_finish', 'required_pace', 'finished_on']
+
+def _book_forecast(cursor, user_id):
+    """Completion forecast for user_id's current book as a book_forecasts row dict (None without reports).
+
+    Only the current book's reports are read: it starts at the first report
+    titled like the latest title after any other title, or where the
+    percent last went down (the book was started over).
+    """
+    cursor.execute('SELECT MAX(date) FROM daily_reports WHERE user_id=?', (user_id,))
+    as_of = cursor.fetchone()[0]
+    if as_of is None:
+        return None
+    cursor.execute('''SELECT book_title FROM daily_reports WHERE user_id=? AND book_title IS NOT NULL
+                      ORDER BY date DESC LIMIT 1''', (user_id,))
+    row = cursor.fetchone()
+    title = row[0] if row else None
+    start = '0001-01-01'
+    if title is not None:
+        cursor.execute('''SELECT date FROM daily_reports
+                          WHERE user_id=? AND book_title IS NOT NULL AND book_title != ?
+                          ORDER BY date DESC LIMIT 1''', (user_id, title))
+        row = cursor.fetchone()
+        cursor.execute('SELECT MIN(date) FROM daily_reports WHERE user_id=? AND book_title=? AND date > ?',
+                       (user_id, title, row[0] if row else start))
+        start = cursor.fetchone()[0]
+    cursor.execute('''SELECT date, accumulated_reading_percent FROM daily_reports
+                      WHERE user_id=? AND date >= ? AND accumulated_reading_percent IS NOT NULL
+                      ORDER BY date''', (user_id, start))
+    readings = cursor.fetchall()
+    drop = next((i for i in range(len(readings) - 1, 0, -1) if readings[i][1] < readings[i - 1][1]), None)
+    if drop is not None:
+        readings = readings[drop:]
+        start = readings[0][0]
+    elif title is None:
+        start = readings[0][0] if readings else as_of
+    started_on = start
+    percent = readings[-1][1] if readings else 0.0
+
+    sticky = get_last_explicit_fields(user_id, as_of, ['word_count', 'expected_weekly_reading_rate'])
+    word_count = sticky['word_count'][0]
+    weekly_rate = sticky['expected_weekly_reading_rate'][0]
+    if weekly_rate is None:
+        weekly_rate = 35000          # never saved: the app-wide default
+    planned_pace = (100.0 * weekly_rate / word_count) / 7.0 if word_count else None
+
+    # recent pace: percent gained since the last reading before the window
+    # (or since the book started), per day
+    last = datetime.strptime(as_of, '%Y-%m-%d')
+    started = datetime.strptime(started_on, '%Y-%m-%d')
+    window_start = (last - timedelta(days=FORECAST_WINDOW_DAYS)).strftime('%Y-%m-%d')
+    base_date, base_percent = started - timedelta(days=1), 0.0
+    for date, value in readings:
+        if date > window_start:
+            break
+        base_date, base_percent = datetime.strptime(date, '%Y-%m-%d'), value
+    recent_pace = (percent - base_percent) / max(1, (last - base_date).days)
+
+    remaining = max(0.0, 100.0 - percent)
+    finished_on = next((date for date, value in readings if value >= 100), None)
+    projected_finish = planned_finish = required_pace = None
+    if finished_on is None and recent_pace > 0:
+        projected_finish = (last + timedelta(days=math.ceil(remaining / recent_pace))).strftime('%Y-%m-%d')
+    if planned_pace:
+        planned = started - timedelta(days=1) + timedelta(days=math.ceil(100.0 / planned_pace))
+        planned_finish = planned.strftime('%Y-%m-%d')
+        required_pace = remaining / max(1, (planned - last).days) if finished_on is None else 0.0
+    return dict(zip(BOOK_FORECAST_COLUMNS, (
+        user_id, title, started_on, as_of, percent, word_count, weekly_rate,
+        round(recent_pace, 3), planned_pace and round(planned_pace, 3), projected_finish,
+        planned_finish, required_pace and round(required_pace, 3), finished_on)))
+
+def refresh_book_forecast(cursor, user_id):
+    """Rewrite user_id's book_forecasts row after a daily report write (on the writer's cursor)."""
+    forecast = _book_forecast(cursor, user_id)
+    if forecast is None:
+        cursor.execute('DELETE FROM book_forecasts WHERE user_id=?', (user_id,))
+        return
+    cursor.execute(f'''
+        INSERT OR REPLACE INTO book_forecasts ({', '.join(BOOK_FORECAST_COLUMNS)})
+        VALUES ({', '.join('?' * len(BOOK_FORECAST_COLUMNS))})
+    ''', [forecast[col] for col in BOOK_FORECAST_COLUMNS])
+
+def rebuild_book_forecasts(cursor):
+    """Recompute every student's book forecast (backfill)."""
+    cursor.execute('SELECT DISTINCT user_id FROM daily_reports')
+    user_ids = [user_id for (user_id,) in cursor.fetchall()]
+    for user_id in user_ids:
+        refresh_book_forecast(cursor, user_id)
+    return len(user_ids)
+
+class _QueuedWrite:
+    def __init__(self, key, write, refresh):
+        self.key, self.write, self.refresh = key, write, refresh
+        self.result = self.error = None
+        self.sql_stats = {'statements': 0, 'seconds': 0.0, 'connections': set()}
+        self.superseded = []         # earlier writes to the same key this one replaced
+        self.done = threading.Event()
+
+    def finish(self):
+        for job in (self, *self.superseded):
+            job.result, job.error, job.sql_stats = self.result, self.error, self.sql_stats
+            job.done.set()
+
+class WriteQueue:
+    """Single writer thread per process that commits daily report saves in grouped transactions.
+
+    submit() queues a write and blocks until the transaction holding it has
+    committed, so an acknowledged save is on disk and visible to the next
+    request.  Writes queued while a batch is committing go into the next
+    batch, which the writer takes as one BEGIN IMMEDIATE transaction: no
+    request thread holds a read snapshot it later has to upgrade, and each
+    student's weekly aggregates are refreshed once per batch instead of once
+    per save.  A pending write is replaced by a later one with the same key.
+    close() flushes what is queued; it runs at interpreter exit.
+    """
+
+    def __init__(self, linger_seconds, max_batch, timeout_seconds):
+        self.linger_seconds = linger_seconds      # wait this long for a batch to fill
+        self.max_batch = max_batch
+        self.timeout_seconds = timeout_seconds    # longest submit() waits for its commit
+        self._cond = threading.Condition()
+        self._pending = OrderedDict()             # key -> _QueuedWrite
+        self._thread = None
+        self._pid = None
+        self._closed = False
+        self.batches = self.writes = self.coalesced = self.failed = 0
+
+    def submit(self, key, write, refresh=None):
+        """Run write(cursor) on the writer thread; returns its result once committed.
+
+        key identifies writes that fully replace each other (None: never
+        coalesced).  refresh=(user_id, date) has that student's weekly
+        aggregates refreshed for date in the same transaction.  Re-raises
+        the write's exception, or TimeoutError if no commit came in time and
+        the write was withdrawn before the writer took it.
+        """
+        job = _QueuedWrite(key, write, refresh)
+        with self._cond:
+            queued = not self._closed
+            if queued:
+                if self._pid != os.getpid():
+                    # first write in this (possibly forked) process
+                    self._pending.clear()
+                    self._pid = os.getpid()
+                    self._thread = threading.Thread(target=self._run, name='hstracker-writer', daemon=True)
+                    self._thread.start()
+                queue_key = key if key is not None else ('job', id(job))
+                replaced = self._pending.pop(queue_key, None)
+                if replaced is not None:
+                    job.superseded = [replaced, *replaced.superseded]
+                    self.coalesced += 1
+                self._pending[queue_key] = job
+                self._cond.notify_all()
+        if not queued:
+            self._commit([job])          # shutting down: write on the caller's thread
+        elif not job.done.wait(self.timeout_seconds):
+            self._withdraw(queue_key, job)
+        stats = g.get('sql_stats') if has_request_context() else None
+        if stats is not None and queued:
+            stats['statements'] += job.sql_stats['statements']
+            stats['seconds'] += job.sql_stats['seconds']
+            stats['connections'] |= job.sql_stats['connections']
+        return self._outcome(job)
+
+    def _withdraw(self, queue_key, job):
+        """Take a timed-out job back out of the queue, so the TimeoutError is accurate.
+
+        A job the writer has not taken yet is dropped (with the writes it had
+        replaced, whose submitters get the same TimeoutError), or unlinked from
+        the later write that replaced it.  A job already in a running batch
+        cannot be withdrawn: wait for that batch's outcome instead.
+        """
+        error = TimeoutError(f"write not committed within {self.timeout_seconds:g}s")
+        with self._cond:
+            current = self._pending.get(queue_key)
+            if current is job:
+                del self._pending[queue_key]
+            elif current is not None and job in current.superseded:
+                current.superseded.remove(job)
+                job.superseded = []
+            else:
+                current = None
+        if current is None:
+            job.done.wait()
+            return
+        job.error = error
+        job.finish()
+
+    @staticmethod
+    def _outcome(job):
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if not self._pending:
+                    return
+                deadline = time.monotonic() + self.linger_seconds
+                while not self._closed and len(self._pending) < self.max_batch:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch = []
+                while self._pending and len(batch) < self.max_batch:
+                    batch.append(self._pending.popitem(last=False)[1])
+            self._commit(batch)
+
+    def _commit(self, batch):
+        """Run batch in one transaction; a failing write is rolled back on its own.
+
+        Each job's SQL statistics cover its own write plus the whole batch's
+        transaction and refresh statements, which it shares.
+        """
+        _db_local.sql_label = 'write_queue'
+        conn = get_db()
+        c = conn.cursor()
+        shared = _db_local.write_stats = {'statements': 0, 'seconds': 0.0, 'connections': set()}
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            c.execute('BEGIN IMMEDIATE')
+            refresh = {}     # user_id -> (first date, last date) written
+            for job in batch:
+                c.execute('SAVEPOINT queued_write')
+                _db_local.write_stats = job.sql_stats
+                try:
+                    job.result = job.write(conn.cursor())
+                    if job.refresh:
+                        # before the next job, whose carry-forward lookups must see this save
+                        refresh_carry_forward(c, *job.refresh)
+                except Exception as e:
+                    c.execute('ROLLBACK TO queued_write')
+                    job.error = e
+                finally:
+                    _db_local.write_stats = shared
+                c.execute('RELEASE queued_write')
+                if job.error is None and job.refresh:
+                    user_id, date = job.refresh
+                    first, last = refresh.get(user_id, (date, date))
+                    refresh[user_id] = (min(first, date), max(last, date))
+            for user_id, (first, last) in refresh.items():
+                refresh_weekly_aggregates_for_write(c, user_id, first, last)
+                refresh_book_forecast(c, user_id)
+                invalidate_weekly_progress(c, user_id)
+            conn.commit()
+        except Exception as e:
+            log.exception("Write batch of %s failed", len(batch))
+            conn.rollback()
+            for job in batch:
+                job.error = job.error or e
+        finally:
+            _db_local.write_stats = _db_local.sql_label = None
+        for job in batch:
+            job.sql_stats['statements'] += shared['statements']
+            job.sql_stats['seconds'] += shared['seconds']
+            job.sql_stats['connections'] |= shared['connections']
+        with self._cond:
+            self.batches += 1
+            self.writes += len(batch)
+            self.failed += sum(job.error is not None for job in batch)
+        for job in batch:
+            job.finish()
+
+    def close(self, timeout=None):
+        """Stop taking writes and wait for the queued ones to commit."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+            thread = self._thread if self._pid == os.getpid() else None
+        if thread is not None:
+            thread.join(timeout if timeout is not None else self.timeout_seconds)
+
+    def stats(self):
+        with self._cond:
+            return {'pending': len(self._pending), 'batches': self.batches, 'writes': self.writes,
+                    'coalesced': self.coalesced, 'failed': self.failed,
+                    'writes_per_batch': round(self.writes / self.batches, 2) if self.batches else None}
+
+write_queue = WriteQueue(
+    linger_seconds=float(os.environ.get('HSTRACKER_WRITE_LINGER_MS', 0)) / 1000.0,
+    max_batch=int(os.environ.get('HSTRACKER_WRITE_MAX_BATCH', 64)),
+    timeout_seconds=float(os.environ.get('HSTRACKER_WRITE_TIMEOUT_MS', 30000)) / 1000.0)
+# flush on shutdown (gunicorn workers exit through sys.exit, which runs atexit)
+atexit.register(write_queue.close)
+
 @app.route('/login', methods=['POST'])
 def login():
     data = request.json
     username = data.get('username')
     password = data.get('password')
 
-    with sqlite3.connect(DATABASE) as conn:
+    with get_db() as conn:
         c = conn.cursor()
         c.execute('SELECT id, role FROM users WHERE username=? AND password=?', (username, password))
         user = c.fetchone()
@@ -427,11 +1634,11 @@ def login():
 
 @app.route('/admin/users', methods=['GET'])
 def get_users():
-    with sqlite3.connect(DATABASE) as conn:
-        c = conn.cursor()
-        c.execute('SELECT id, username FROM users WHERE role="student"')
-        users = [{'id': row[0], 'username': row[1]} for row in c.fetchall()]
-    return jsonify(users), 200
+    return versioned_json(('users',), _student_users)
+
+def _student_users(cursor):
+    cursor.execute('SELECT id, username FROM users WHERE role="student"')
+    return [{'id': row[0], 'username': row[1]} for row in cursor.fetchall()]
 
 @app.route('/admin/add-user', methods=['POST'])
 def add_user():
@@ -440,11 +1647,10 @@ def add_user():
     password = data['password']
     role = data.get('role', 'student')  # default role: student
 
-    with sqlite3.connect(DATABASE) as conn:
+    with get_db() as conn:
         c = conn.cursor()
         try:
             c.execute('INSERT INTO users (username, password, role) VALUES (?, ?, ?)', (username, password, role))
-            conn.commit()
             new_user_id = c.lastrowid
             default_defs = [
                 ('expected_math_points', 'Math (Pts)', 'number'),
@@ -465,6 +1671,10 @@ def add_user():
                     (student_id, slug, label, field_type, is_default, readonly)
                     VALUES (?, ?, ?, ?, 1, 0)
                     ''', (new_user_id, slug, label, field_type))
+            # bump only once the defaults are in, so no cache can hold the
+            # new student's version with an empty definition list
+            bump_cache_version(c, 'users')
+            bump_cache_version(c, f'definitions:{new_user_id}')
             conn.commit()
             return jsonify({'status': 'success', 'newUserId': new_user_id}), 201
         except sqlite3.IntegrityError:
@@ -474,41 +1684,36 @@ def add_user():
 # GET all task definitions for a student NEW FUNCTION
 @app.route('/admin/user/<int:student_id>/task-definitions', methods=['GET'])
 def get_task_definitions(student_id):
-    with sqlite3.connect(DATABASE) as conn:
-        conn.row_factory = sqlite3.Row
-        c=conn.cursor()
-        c.execute('''
-          SELECT id, slug, label, field_type, readonly, is_default, is_active
-            FROM task_definitions
-           WHERE student_id=?
-           ORDER BY is_default DESC, created_at
-        ''', (student_id,))
-        defs = [
-          {'id':row['id'],'slug':row['slug'],'label':row['label'],
-           'field_type':row['field_type'],'readonly':bool(row['readonly']), 
-           'is_default':bool(row['is_default']), 'is_active':bool(row['is_active'])}
-          for row in c.fetchall()
-        ]
-    return jsonify(defs), 200
+    return versioned_json((f'definitions:{student_id}',),
+                          lambda c: _task_definitions(c, student_id))
+
+def _task_definitions(cursor, student_id):
+    return [
+      {'id':row[0],'slug':row[1],'label':row[2],
+       'field_type':row[3],'readonly':bool(row[4]),
+       'is_default':bool(row[5]), 'is_active':bool(row[6])}
+      for row in student_definitions(cursor, student_id)
+    ]
 
 # POST to create/update definitions in bulk NEW FUNCTION
 @app.route('/admin/user/<int:student_id>/task-definitions', methods=['POST'])
 def update_task_definitions(student_id):
     defs_payload = request.json  # list of {id?, slug, label, field_type}
-    with sqlite3.connect(DATABASE) as conn:
-      conn.row_factory = sqlite3.Row
-      c=conn.cursor()
-      # delete any custom defs not in incoming set
-      incoming_db_ids = [d['id'] for d in defs_payload if d.get('id') and int(d['id']) > 0]
-      if incoming_db_ids:
-        placeholders = ','.join('?' * len(incoming_db_ids))
-        c.execute(f'''
-          DELETE FROM task_definitions
-           WHERE student_id=? AND is_default=0
-             AND id NOT IN ({placeholders})
-        ''', [student_id]+incoming_db_ids)
-      else:
-        c.execute('DELETE FROM task_definitions WHERE student_id=? AND is_default=0', (student_id,))
+    with get_db() as conn:
+      c = conn.cursor()
+      c.row_factory = sqlite3.Row
+      # delete any custom defs not in incoming set, with their daily values
+      # and plan cells: a re-added slug gets a new id and starts empty
+      incoming_db_ids = [int(d['id']) for d in defs_payload if d.get('id') and int(d['id']) > 0]
+      c.execute('SELECT id FROM task_definitions WHERE student_id=? AND is_default=0', (student_id,))
+      removed_ids = [row['id'] for row in c.fetchall() if row['id'] not in incoming_db_ids]
+      if removed_ids:
+        placeholders = ','.join('?' * len(removed_ids))
+        # one scan: daily_task_values is keyed on (report_id, task_def_id)
+        c.execute(f'DELETE FROM daily_task_values WHERE task_def_id IN ({placeholders})', removed_ids)
+        c.execute(f'DELETE FROM task_entries WHERE student_id=? AND task_def_id IN ({placeholders})',
+                  [student_id] + removed_ids)
+        c.execute(f'DELETE FROM task_definitions WHERE id IN ({placeholders})', removed_ids)
       # update each
       for d in defs_payload:
         label = d.get('label', '').strip()
@@ -534,35 +1739,26 @@ def update_task_definitions(student_id):
             # Check if slug already exists for this student to prevent UNIQUE constraint errors
             c.execute("SELECT id FROM task_definitions WHERE student_id=? AND slug=?", (student_id, slug))
             if c.fetchone():
-                print(f"Skipping insert for duplicate slug '{slug}' for student {student_id}")
+                log.info("Skipping insert for duplicate slug '%s' for student %s", slug, student_id)
                 continue
 
-            # Add to daily_reports table if it's a new custom TEXT or NUMBER field
-            # This logic was in your original code. Be careful with schema alterations on the fly.
-            if d.get('field_type') in ('text', 'number') and not d.get('is_default'):
-                # Check if column already exists
-                c.execute(f"PRAGMA table_info(daily_reports)")
-                existing_columns = {row['name'] for row in c.fetchall()}
-                if slug not in existing_columns:
-                    sql_type = 'INTEGER' if d['field_type'] == 'number' else 'TEXT'
-                    try:
-                        c.execute(f"ALTER TABLE daily_reports ADD COLUMN \"{slug}\" {sql_type}")
-                        print(f"Added column {slug} to daily_reports for student {student_id}")
-                    except Exception as e:
-                        print(f"Error adding column {slug} to daily_reports: {e}")
-            
+            # daily values of custom tasks go to daily_task_values, so no
+            # daily_reports column is needed
             c.execute('''
                 INSERT INTO task_definitions
                     (student_id, slug, label, field_type, is_default, readonly, is_active)
                 VALUES (?, ?, ?, ?, 0, 0, ?)
             ''', (student_id, slug, label, field_type, is_active_val))
-    conn.commit()
+      bump_cache_version(c, f'definitions:{student_id}')   # before the refresh reads them
+      refresh_weekly_aggregates(c, student_id)
+      invalidate_weekly_progress(c, student_id)
+      conn.commit()
     # After all operations, fetch and return the complete, current list of definitions
     c.execute('''
         SELECT id, slug, label, field_type, readonly, is_default, is_active
         FROM task_definitions
         WHERE student_id=?
-        ORDER BY is_default DESC, created_at
+        ORDER BY is_default DESC, created_at, id
     ''', (student_id,))
     
     updated_defs_list = [
@@ -575,53 +1771,78 @@ def update_task_definitions(student_id):
 
 @app.route('/admin/user/<int:student_id>/task-entries', methods=['GET'])
 def get_task_entries(student_id):
-    with sqlite3.connect(DATABASE) as conn:
-        c = conn.cursor()
-        c.execute('''
-          SELECT td.slug, te.day_of_week, te.value
-            FROM task_entries te
-            JOIN task_definitions td ON td.id=te.task_def_id
-           WHERE te.student_id=?
-        ''', (student_id,))
-        rows = c.fetchall()
-
+    # entries are keyed by slug, so a definition change can alter them too
+    return versioned_json((f'entries:{student_id}', f'definitions:{student_id}'),
+                          lambda c: _task_entries(c, student_id))
+
+def _task_entries(cursor, student_id):
+    cursor.execute('''
+      SELECT td.slug, te.day_of_week, te.value
+        FROM task_entries te
+        JOIN task_definitions td ON td.id=te.task_def_id
+       WHERE te.student_id=?
+    ''', (student_id,))
     tasks = {d: {} for d in
              ['Monday','Tuesday','Wednesday','Thursday','Friday','Saturday','Sunday']}
-    for slug, day, val in rows:
+    for slug, day, val in cursor.fetchall():
         tasks[day][slug] = val
-    return jsonify(tasks), 200
+    return tasks
 
 @app.route('/admin/user/<int:student_id>/task-entries', methods=['POST'])
 def update_task_entries(student_id):
     data = request.json  # { "Monday": {"math_points":"10",…}, … }
-    with sqlite3.connect(DATABASE) as conn:
+    if not isinstance(data, dict) or not all(isinstance(t, dict) for t in data.values()):
+        return jsonify({'status': 'failure',
+                        'message': 'Expected an object of days, each an object of task values.'}), 400
+    with get_db() as conn:
         c = conn.cursor()
         # map slug→id
         c.execute('SELECT id, slug, field_type FROM task_definitions WHERE student_id=?',
                   (student_id,))
         field_map = {r[1]: (r[0], r[2]) for r in c.fetchall()}
-        # clear old entries
-        c.execute('DELETE FROM task_entries WHERE student_id=?',
-                  (student_id,))
-        # insert new
+        # validate the whole plan before writing anything
+        wanted = {}     # (task_def_id, day) -> value
         for day, tasks in data.items():
+            if day not in FULL_WEEKDAYS:
+                return jsonify({
+                    'status': 'failure',
+                    'message': f'Unknown day "{day}"; expected one of {", ".join(FULL_WEEKDAYS)}.'
+                }), 400
             for slug, val in tasks.items():
-                tdid, field_type = field_map.get(slug, (None, None)) 
+                tdid, field_type = field_map.get(slug, (None, None))
                 if not tdid or val in (None, ''):
                     continue
                 if field_type in ('number', 'percent'):
                     try:
                         int(val)
-                    except ValueError:
+                    except (TypeError, ValueError):
                         return jsonify({
                             'status': 'failure',
                             'message': f'Task "{slug}" requires an integer value.'
                         }), 400
-                c.execute('''
-                    INSERT INTO task_entries
-                    (student_id, task_def_id, day_of_week, value)
-                    VALUES (?,?,?,?)
-                    ''', (student_id, tdid, day, val))
+                wanted[(tdid, day)] = val
+
+        # diff against the saved plan; value is TEXT, so compare as text
+        c.execute('SELECT task_def_id, day_of_week, value FROM task_entries WHERE student_id=?',
+                  (student_id,))
+        saved = {(tdid, day): val for tdid, day, val in c.fetchall()}
+        removed = [(student_id, tdid, day) for tdid, day in saved.keys() - wanted.keys()]
+        changed = [(student_id, tdid, day, val) for (tdid, day), val in wanted.items()
+                   if saved.get((tdid, day)) != (val if isinstance(val, str) else str(val))]
+        if not removed and not changed:
+            return jsonify({'status':'success'}), 200
+
+        c.executemany('DELETE FROM task_entries WHERE student_id=? AND task_def_id=? AND day_of_week=?',
+                      removed)
+        c.executemany('''
+            INSERT INTO task_entries
+            (student_id, task_def_id, day_of_week, value)
+            VALUES (?,?,?,?)
+            ON CONFLICT(student_id, task_def_id, day_of_week) DO UPDATE SET value=excluded.value
+            ''', changed)
+        invalidate_weekly_progress(c, student_id)
+        bump_cache_version(c, f'entries:{student_id}')
+        refresh_weekly_aggregates(c, student_id)
         conn.commit()
     return jsonify({'status':'success'}), 200
 
@@ -629,45 +1850,54 @@ def update_task_entries(student_id):
 @app.route('/admin/user/<int:user_id>/daily-report/<date>', methods=['GET'])
 def get_daily_report(user_id, date):
     # DYNAMIC: pull every slug & type from task_definitions
-    with sqlite3.connect(DATABASE) as conn:
+    with get_db() as conn:
         c = conn.cursor()
-        c.execute('''
-            SELECT slug, field_type
-            FROM task_definitions
-            WHERE student_id=? AND (is_active=1 OR is_default=1)
-            ORDER BY is_default DESC, created_at
-            ''', (user_id,))
-        defs = c.fetchall()
-
-        fields = [slug for slug, _ in defs]
-        numeric_fields = [slug for slug, ft in defs if ft in ('number','percent')]
-        carry_forward_fields = ['book_title','word_count','expected_weekly_reading_rate']
-        
-        if not fields:
-            # nothing defined yet → avoid bad SQL
-            return jsonify({'exists': False, 'report': {}}), 200
-        
-        c.execute(f'''
-            SELECT {', '.join(f'"{col}"' for col in fields)}
-            FROM daily_reports
-            WHERE user_id=? AND date=?
-        ''', (user_id, date))
-        row = c.fetchone()
-        
+        defs = [(slug, field_type) for _, slug, _, field_type, _, is_default, is_active
+                in student_definitions(c, user_id) if is_active or is_default]
+        report = _daily_report(c, user_id, date, defs)
+    return jsonify(report), 200
+
+def _daily_report(cursor, user_id, date, defs, carried=None):
+    """{'exists', 'report'} for one day; defs are the (slug, field_type) pairs to return.
+
+    carried may hold get_last_explicit_fields() results as of date for the
+    carry-forward fields; otherwise the missing ones are resolved here.
+    """
+    fields = [slug for slug, _ in defs]
+    numeric_fields = [slug for slug, ft in defs if ft in ('number','percent')]
+    carry_forward_fields = ['book_title','word_count','expected_weekly_reading_rate']
+
+    if not fields:
+        # nothing defined yet → avoid bad SQL
+        return {'exists': False, 'report': {}}
+
+    columns = [field for field in fields if field in REPORT_COLUMNS]
+    cursor.execute(f'''
+        SELECT {', '.join(['id'] + [f'"{col}"' for col in columns])}
+        FROM daily_reports
+        WHERE user_id=? AND date=?
+    ''', (user_id, date))
+    row = cursor.fetchone()
+    if row:
+        stored = dict(zip(columns, row[1:]))
+        if len(columns) < len(fields):
+            stored.update(_task_values(cursor, user_id, date, date).get(date, {}))
+        row = [stored.get(field) for field in fields]
+
+    if carried is None:
+        # resolve every carry-forward field that has no value today in one query
+        missing = [field for idx, field in enumerate(fields)
+                   if field in carry_forward_fields and (row is None or row[idx] is None)]
+        carried = get_last_explicit_fields(user_id, date, missing)
+
     report_data = {}
     
     if row:
         for idx, field in enumerate(fields):
             value = row[idx]
             if value is None and field in carry_forward_fields:
-                # explicitly fetch last set value
-                value = get_last_explicit_field_value(user_id, date, field)
-
-                # Explicitly check if the date of the fetched value is NOT in future
-                if value is not None:
-                    value_date = get_last_explicit_field_date(user_id, date, field)
-                    if value_date and value_date > date:
-                        value = None  # explicitly don't use future values
+                # explicitly fetch last set value (resolver never returns future dates)
+                value = carried[field][0]
 
             if value is not None and field in numeric_fields:
                 try:
@@ -682,13 +1912,7 @@ def get_daily_report(user_id, date):
         # No entry for this date, explicitly carry forward only specific fields
         for field in fields:
             if field in carry_forward_fields:
-                value = get_last_explicit_field_value(user_id, date, field)
-
-                # Explicit future-date safeguard here too
-                if value is not None:
-                    value_date = get_last_explicit_field_date(user_id, date, field)
-                    if value_date and value_date > date:
-                        value = None
+                value = carried[field][0]
             else:
                 value = None
 
@@ -702,157 +1926,301 @@ def get_daily_report(user_id, date):
                     value = None
             report_data[field] = value
 
-    return jsonify({'exists': bool(row), 'report': report_data}), 200
+    return {'exists': bool(row), 'report': report_data}
 
 @app.route('/admin/user/<int:user_id>/daily-report/<date>', methods=['POST'])
 def update_daily_report(user_id, date):
     data = request.json # Received payload from frontend
-    print(f"--- update_daily_report Endpoint ---")
-    print(f"Received request for user {user_id}, date {date}. Payload: {data}")
-
-    with sqlite3.connect(DATABASE) as conn:
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        # DYNAMIC: load all task slugs + types
-        c.execute('''
-            SELECT slug, field_type
-            FROM task_definitions
-            WHERE student_id=?
-            ORDER BY is_default DESC, created_at
-            ''', (user_id,))
-        # Use dictionary comprehension for faster lookup
-        defs_map = {row['slug']: row['field_type'] for row in c.fetchall()}
-        fields = list(defs_map.keys()) # List of ALL slugs (column names)
-        numeric_fields = {slug for slug, ft in defs_map.items() if ft in ('number', 'percent')}
-
-        processed_data = {} # Dictionary to hold final values for DB
-        # Define key slugs
-        rate_slug = 'expected_weekly_reading_rate'
-        count_slug = 'word_count'
-        expected_percent_slug = 'expected_daily_reading_percent'
-        # --- ADD book_title slug ---
-        title_slug = 'book_title'
-
-        # --- Determine word_count and rate for calculation ---
-        current_word_count = None
-        current_rate = None
-
-        # Prioritize incoming data
-        if count_slug in data and data[count_slug] not in [None, '']:
-            try: current_word_count = int(data[count_slug])
-            except (ValueError, TypeError): pass
-        if rate_slug in data and data[rate_slug] not in [None, '']:
-            try: current_rate = int(data[rate_slug])
-            except (ValueError, TypeError): pass
-
-        # If not in incoming data, fetch last known values
-        if current_word_count is None:
-            last_count = get_last_explicit_field_value(user_id, date, count_slug)
-            if last_count is not None: current_word_count = int(last_count)
-        if current_rate is None:
-            last_rate = get_last_explicit_field_value(user_id, date, rate_slug)
-            if last_rate is not None:
-                try: current_rate = int(last_rate) # Try converting from DB
-                except (ValueError, TypeError): pass # Ignore potential DB data errors
-            else:
-                # 3. Apply default ONLY if no incoming AND no previously saved value exists for rate
-                # (We might refine this check slightly based on the 'never set' logic)
-                # Let's check if a rate was *ever* set for this user before applying default
-                c.execute("SELECT 1 FROM daily_reports WHERE user_id = ? AND expected_weekly_reading_rate IS NOT NULL LIMIT 1", (user_id,))
-                if not c.fetchone():
-                     print(f"Applying default rate (35000) for user {user_id} as no rate was ever set.")
-                     current_rate = 35000
-                # else: current_rate remains None if it was set previously but not found for this specific lookup
-
-        print(f"Determined calculation values: current_word_count={current_word_count}, current_rate={current_rate}") # Log result
-        # --- Calculate expected_daily_reading_percent ---
-        calculated_expected_percent = None
-        if current_rate is not None and current_word_count is not None and current_word_count > 0:
-            try:
-                raw_percent_for_storage = (100.0 * current_rate / current_word_count) / 7.0
-                # If you want to store it rounded to an INTEGER with "round half up":
-                # calculated_expected_percent = int(raw_percent_for_storage + 0.5)
-                calculated_expected_percent = round(raw_percent_for_storage, 2)
-            except TypeError: pass # Handles potential None types if logic above failed
+    try:
+        datetime.strptime(date, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({'status': 'failure', 'message': 'Invalid date format. Use YYYY-MM-DD.'}), 400
+    log.debug("update_daily_report for user %s, date %s. Payload: %s", user_id, date, data)
 
-        # --- Process all fields for saving ---
-        for field in fields:
-            value = None
-            # Use calculated value for expected_daily_reading_percent
-            if field == expected_percent_slug:
-                value = calculated_expected_percent
-            # Use determined values for rate and count
-            elif field == rate_slug:
-                 value = current_rate
-                 print(f"  - Slug '{field}': Using determined value: {value}")
-            elif field == count_slug:
-                 value = current_word_count
-                 print(f"  - Slug '{field}': Using determined value: {value}")
-            # --- Does it correctly handle book_title and other text fields? ---
-            elif field in data and data[field] not in [None, '']:
-                 # Use incoming data if available
-                 value = data[field]
-                 print(f"  - Slug '{field}': Using value from incoming payload: '{value}'")
-                 # Convert numeric fields safely (but this doesn't apply to book_title)
-                 if field in numeric_fields:
-                     try:
-                         # Handle potential floats if needed, otherwise int
-                         value = float(value) if '.' in str(value) else int(value)
-                     except (ValueError, TypeError):
-                         print(f"    - WARNING: Could not convert numeric field '{field}' value '{data[field]}' to number. Setting to None.")
-                         value = None
-            else:
-                 # If not calculated and not in incoming payload, set to None (or handle carry-forward differently if needed)
-                 # The previous logic implicitly set others to None if not handled above
-                 value = None
-                 print(f"  - Slug '{field}': No calculated/incoming value, setting to None.")
+    try:
+        # the save (carry-forward lookups included) runs on the writer thread,
+        # inside the transaction that commits it; the aggregates are refreshed there
+        write_queue.submit(('daily_report', user_id, date),
+                           lambda c: _save_daily_report(c, user_id, date, data), refresh=(user_id, date))
+        return jsonify({'status': 'success'}), 200
+    except Exception as e:
+        log.exception("Database error saving daily report for user %s, date %s", user_id, date)
+        return jsonify({'status': 'failure', 'message': f'Database error: {e}'}), 500
+
+def _save_daily_report(c, user_id, date, data):
+    """Upsert user_id's daily report for date from a /daily-report payload, on cursor c.
+
+    Sticky fields the payload leaves out are resolved from earlier reports
+    through the same connection, so queued saves see each other.  Does not
+    refresh the weekly aggregates or commit.
+    """
+    c.row_factory = sqlite3.Row
+    # DYNAMIC: load all task slugs + types
+    # Use dictionary comprehension for faster lookup
+    defs_map = {row[1]: row[3] for row in student_definitions(c, user_id)}
+    fields = list(defs_map.keys()) # List of ALL slugs (column names)
+    numeric_fields = {slug for slug, ft in defs_map.items() if ft in ('number', 'percent')}
+
+    processed_data = {} # Dictionary to hold final values for DB
+    # Define key slugs
+    rate_slug = 'expected_weekly_reading_rate'
+    count_slug = 'word_count'
+    expected_percent_slug = 'expected_daily_reading_percent'
+    # --- ADD book_title slug ---
+    title_slug = 'book_title'
+
+    # --- Determine word_count and rate for calculation ---
+    current_word_count = None
+    current_rate = None
+
+    # Prioritize incoming data
+    if count_slug in data and data[count_slug] not in [None, '']:
+        try: current_word_count = int(data[count_slug])
+        except (ValueError, TypeError): pass
+    if rate_slug in data and data[rate_slug] not in [None, '']:
+        try: current_rate = int(data[rate_slug])
+        except (ValueError, TypeError): pass
+
+    # If not in incoming data, fetch last known values (both in one lookup)
+    last_known = get_last_explicit_fields(
+        user_id, date,
+        [slug for slug, current in ((count_slug, current_word_count), (rate_slug, current_rate))
+         if current is None])
+    if current_word_count is None:
+        last_count = last_known[count_slug][0]
+        if last_count is not None: current_word_count = int(last_count)
+    if current_rate is None:
+        last_rate = last_known[rate_slug][0]
+        if last_rate is not None:
+            try: current_rate = int(last_rate) # Try converting from DB
+            except (ValueError, TypeError): pass # Ignore potential DB data errors
+        else:
+            # 3. Apply default ONLY if no incoming AND no previously saved value exists for rate
+            # (We might refine this check slightly based on the 'never set' logic)
+            # Let's check if a rate was *ever* set for this user before applying default
+            if not rate_ever_set(c, user_id):
+                 log.debug("Applying default rate (35000) for user %s as no rate was ever set.", user_id)
+                 current_rate = 35000
+            # else: current_rate remains None if it was set previously but not found for this specific lookup
+
+    log.debug("Determined calculation values: current_word_count=%s, current_rate=%s", current_word_count, current_rate)
+    # --- Calculate expected_daily_reading_percent ---
+    calculated_expected_percent = expected_daily_reading_percent(current_rate, current_word_count)
+
+    # --- Process all fields for saving ---
+    for field in fields:
+        value = None
+        # Use calculated value for expected_daily_reading_percent
+        if field == expected_percent_slug:
+            value = calculated_expected_percent
+        # Use determined values for rate and count
+        elif field == rate_slug:
+             value = current_rate
+             log.debug("  - Slug '%s': Using determined value: %s", field, value)
+        elif field == count_slug:
+             value = current_word_count
+             log.debug("  - Slug '%s': Using determined value: %s", field, value)
+        # --- Does it correctly handle book_title and other text fields? ---
+        elif field in data and data[field] not in [None, '']:
+             # Use incoming data if available
+             value = data[field]
+             log.debug("  - Slug '%s': Using value from incoming payload: '%s'", field, value)
+             # Convert numeric fields safely (but this doesn't apply to book_title)
+             if field in numeric_fields:
+                 try:
+                     # Handle potential floats if needed, otherwise int
+                     value = float(value) if '.' in str(value) else int(value)
+                 except (ValueError, TypeError):
+                     log.warning("Could not convert numeric field '%s' value '%s' to number. Setting to None.", field, data[field])
+                     value = None
+        else:
+             # If not calculated and not in incoming payload, set to None (or handle carry-forward differently if needed)
+             # The previous logic implicitly set others to None if not handled above
+             value = None
+             log.debug("  - Slug '%s': No calculated/incoming value, setting to None.", field)
+
+        processed_data[field] = value # Assign final value for this field
+    # --- *** END PROBLEM AREA CHECK *** ---
+
+    log.debug("Final processed data for DB: %s", processed_data)
+
+    columns     = [f for f in fields if f in REPORT_COLUMNS]
+    cols        = ', '.join(f'"{f}"' for f in columns)         # "book_title", "word_count", …
+    placeholders = ', '.join('?' for _ in columns)             # ?, ?, ?, …
+    upd         = ', '.join(f'"{f}" = EXCLUDED."{f}"' for f in columns)
+    c.execute(f'''
+        INSERT INTO daily_reports (user_id, date, {cols})
+        VALUES (?, ?, {placeholders})
+        ON CONFLICT(user_id, date) DO UPDATE SET
+            {upd}
+    ''', [user_id, date, *[processed_data[f] for f in columns]])
+    save_task_values(c, user_id, {date: {f: processed_data[f] for f in fields
+                                         if f not in REPORT_COLUMNS}})
+
+def _read_import_rows():
+    """Rows of a bulk import: a JSON array, an uploaded CSV file or a text/csv body."""
+    upload = request.files.get('file')
+    if upload:
+        return list(csv.DictReader(io.StringIO(upload.read().decode('utf-8-sig'))))
+    if request.mimetype == 'text/csv':
+        return list(csv.DictReader(io.StringIO(request.get_data(as_text=True))))
+    rows = request.get_json(silent=True)
+    if not isinstance(rows, list):
+        raise ValueError("Expected a JSON array of reports or a CSV file.")
+    return rows
+
+@app.route('/admin/daily-reports/import', methods=['POST'])
+def import_daily_reports():
+    """Bulk upsert of daily reports, one transaction for the whole batch.
+
+    Every row needs user_id (or ?user_id=) and date, plus any of the
+    student's task slugs.  Rows are processed per student in date order
+    with the same rules as update_daily_report: word_count and
+    expected_weekly_reading_rate carry forward (across the batch as well as
+    from saved history) and expected_daily_reading_percent is derived.
+    Invalid rows are reported and skipped; the rest are written.
+    """
+    started = time.perf_counter()
+    try:
+        rows = _read_import_rows()
+    except (ValueError, UnicodeDecodeError) as e:
+        return jsonify({'status': 'failure', 'message': str(e)}), 400
+    default_user_id = request.args.get('user_id', type=int)
+
+    rate_slug = 'expected_weekly_reading_rate'
+    count_slug = 'word_count'
+    expected_percent_slug = 'expected_daily_reading_percent'
+
+    errors = []
+    by_user = {}                                  # user_id -> {date: (row number, row)}
+    for number, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append({'row': number, 'error': 'Row must be an object.'})
+            continue
+        try:
+            user_id = int(row.get('user_id') or default_user_id)
+            date = str(row.get('date') or '').strip()
+            datetime.strptime(date, '%Y-%m-%d')
+        except (TypeError, ValueError):
+            errors.append({'row': number, 'error': 'Row needs an integer user_id and a YYYY-MM-DD date.'})
+            continue
+        reports = by_user.setdefault(user_id, {})
+        if date in reports:
+            errors.append({'row': number, 'error': f'Duplicate of row {reports[date][0]} (user {user_id}, {date}).'})
+            continue
+        reports[date] = (number, row)
 
-            processed_data[field] = value # Assign final value for this field
-        # --- *** END PROBLEM AREA CHECK *** ---
+    imported = 0
+    with get_db() as conn:
+        c = conn.cursor()
+        batches = []                              # (user_id, columns, [values...], {date: custom values})
+        for user_id, reports in by_user.items():
+            defs_map = {row[1]: row[3] for row in student_definitions(c, user_id)}
+            if not defs_map:
+                errors.extend({'row': number, 'error': f'Unknown student {user_id}.'}
+                              for number, _ in reports.values())
+                continue
+            fields = list(defs_map.keys())
+            columns = [f for f in fields if f in REPORT_COLUMNS]
+            numeric_fields = {slug for slug, ft in defs_map.items() if ft in ('number', 'percent')}
+            dates = sorted(reports)
+
+            # sticky count/rate going into the batch, then each saved change inside its span
+            day_before = (datetime.strptime(dates[0], '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
+            carried = get_last_explicit_fields(user_id, day_before, [count_slug, rate_slug])
+            current_word_count, current_rate = carried[count_slug][0], carried[rate_slug][0]
+            c.execute(f'''
+                SELECT date, {count_slug}, {rate_slug} FROM daily_reports
+                WHERE user_id=? AND date BETWEEN ? AND ?
+                  AND ({count_slug} IS NOT NULL OR {rate_slug} IS NOT NULL)
+                ORDER BY date
+            ''', (user_id, dates[0], dates[-1]))
+            saved_changes = c.fetchall()
+            rate_set = rate_ever_set(c, user_id)
+
+            values, custom, k = [], {}, 0
+            for date in dates:
+                number, row = reports[date]
+                # saved values up to and including this date, as update_daily_report would see them
+                while k < len(saved_changes) and saved_changes[k][0] <= date:
+                    if saved_changes[k][1] is not None: current_word_count = saved_changes[k][1]
+                    if saved_changes[k][2] is not None: current_rate = saved_changes[k][2]
+                    k += 1
+
+                incoming, row_errors = {}, []
+                for field, value in row.items():
+                    if field in ('user_id', 'date') or value in (None, ''):
+                        continue
+                    if field is None or field not in defs_map:
+                        row_errors.append(f'Unknown field "{field}" for student {user_id}.')
+                    elif field in numeric_fields:
+                        try:
+                            incoming[field] = float(value) if '.' in str(value) else int(value)
+                        except (ValueError, TypeError):
+                            row_errors.append(f'Field "{field}" must be a number.')
+                    else:
+                        incoming[field] = value
+                if row_errors:
+                    errors.append({'row': number, 'error': ' '.join(row_errors)})
+                    continue
 
-        # Prepare for DB execution
-        field_list_str = ', '.join(f'"{col}"' for col in fields)
-        placeholder_str = ', '.join(['?'] * (len(fields) + 2))
-        # Build list of values in the SAME order as 'fields' list
-        values_list = [user_id, date] + [processed_data.get(f) for f in fields]
+                if count_slug in incoming: current_word_count = int(incoming[count_slug])
+                if rate_slug in incoming: current_rate = int(incoming[rate_slug])
+                if current_rate is None and not rate_set:
+                    current_rate = 35000
+                rate_set = rate_set or current_rate is not None
+                derived = {count_slug: current_word_count, rate_slug: current_rate,
+                           expected_percent_slug: expected_daily_reading_percent(current_rate, current_word_count)}
+                values.append([user_id, date, *[derived[f] if f in derived else incoming.get(f) for f in columns]])
+                custom[date] = {f: incoming.get(f) for f in fields if f not in REPORT_COLUMNS}
 
-        # Debug print before execution
-        print(f"Final processed data for DB: {processed_data}")
-        print(f"Executing INSERT/REPLACE with fields: user_id, date, {field_list_str}")
-        print(f"Values list for DB: {values_list}")
+            if values:
+                batches.append((user_id, columns, values, custom))
 
         try:
-            cols        = ', '.join(f'"{f}"' for f in fields)          # "book_title", "word_count", …
-            placeholders = ', '.join('?' for _ in fields)              # ?, ?, ?, …
-            upd         = ', '.join(f'"{f}" = EXCLUDED."{f}"' for f in fields)
-            c.execute(f'''
-                INSERT INTO daily_reports (user_id, date, {cols})
-                VALUES (?, ?, {placeholders})
-                ON CONFLICT(user_id, date) DO UPDATE SET
-                    {upd}
-            ''', [user_id, date, *[processed_data[f] for f in fields]])
+            for user_id, columns, values, custom in batches:
+                cols = ', '.join(f'"{f}"' for f in columns)
+                placeholders = ', '.join('?' for _ in columns)
+                upd = ', '.join(f'"{f}" = EXCLUDED."{f}"' for f in columns)
+                c.executemany(f'''
+                    INSERT INTO daily_reports (user_id, date, {cols})
+                    VALUES (?, ?, {placeholders})
+                    ON CONFLICT(user_id, date) DO UPDATE SET
+                        {upd}
+                ''', values)
+                save_task_values(c, user_id, custom)
+                refresh_carry_forward(c, user_id, values[0][1], values[-1][1])
+                refresh_weekly_aggregates_for_write(c, user_id, values[0][1], values[-1][1])
+                refresh_book_forecast(c, user_id)
+                invalidate_weekly_progress(c, user_id)
+                imported += len(values)
             conn.commit()
-            print("Database commit successful.")
-            return jsonify({'status': 'success'}), 200
         except Exception as e:
-            print(f"Database error: {e}") # Log the specific error
+            log.exception("Database error during import")
             conn.rollback()
             return jsonify({'status': 'failure', 'message': f'Database error: {e}'}), 500
 
+    elapsed = time.perf_counter() - started
+    errors.sort(key=lambda e: e['row'])
+    return jsonify({
+        'status': 'success' if not errors else ('partial' if imported else 'failure'),
+        'received': len(rows),
+        'imported': imported,
+        'errors': errors,
+        'elapsed_ms': round(elapsed * 1000, 1),
+        'rows_per_sec': round(imported / elapsed, 1) if elapsed > 0 else None,
+    }), 200 if imported or not rows else 400
 
 @app.route('/last-known-data/<int:user_id>/<date>', methods=['GET'])
 def last_known_data(user_id, date):
-    fields = ['book_title', 'word_count', 'accumulated_reading_percent', 'expected_weekly_reading_rate']
-    data = {}
-
-    for field in fields:
-        data[field] = get_last_explicit_field_value(user_id, date, field)
+    data = {field: value for field, (value, _) in
+            get_last_explicit_fields(user_id, date, LAST_KNOWN_FIELDS).items()}
 
     return jsonify(data), 200
 
 @app.route('/admin/user/<int:user_id>/has-data', methods=['GET'])
 def user_has_data(user_id):
-    with sqlite3.connect(DATABASE) as conn:
+    with get_db() as conn:
         c = conn.cursor()
         c.execute('SELECT COUNT(*) FROM daily_reports WHERE user_id=?', (user_id,))
         has_data = c.fetchone()[0] > 0
@@ -863,20 +2231,30 @@ def submit_data():
     data = request.json
     user_id = data['user_id']
     date = data['date']
+    # a plain INSERT (a second submit for the day fails), so never coalesced
+    write_queue.submit(None, lambda c: _save_submitted_report(c, user_id, date, data),
+                       refresh=(user_id, date))
+    return jsonify({'status':'success'}), 201
 
-    prev_data = get_previous_day_data(user_id, date)
-    book_title = data.get('book_title') or (prev_data[0] if prev_data else None)
+def _save_submitted_report(c, user_id, date, data):
+    """Insert a /submit report on cursor c (the writer's); the lookups share its transaction."""
+    # Sticky values as last explicitly saved up to the previous day, in one lookup
+    prev_date = (datetime.strptime(date, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
+    prev = {field: value for field, (value, _) in get_last_explicit_fields(
+        user_id, prev_date,
+        ['book_title', 'word_count', 'expected_weekly_reading_rate', 'accumulated_reading_percent']).items()}
+    book_title = data.get('book_title') or prev['book_title']
     #print(f"SUBMIT endpoint received date: {date}, user_id: {user_id}, book_title: {book_title}")
     if 'word_count' in data and data['word_count'] not in [None, '']:
         word_count = int(data['word_count'])
-    elif prev_data and prev_data[1] is not None:
-        word_count = prev_data[1]
+    elif prev['word_count'] is not None:
+        word_count = prev['word_count']
     else:
         word_count = None  # Important: allow explicit carry-forward here, don't set to 0!
     if data.get('expected_weekly_reading_rate') not in [None, '']:
         expected_weekly_reading_rate = int(data['expected_weekly_reading_rate'])
-    elif prev_data and prev_data[2]:
-        expected_weekly_reading_rate = int(prev_data[2])
+    elif prev['expected_weekly_reading_rate']:
+        expected_weekly_reading_rate = int(prev['expected_weekly_reading_rate'])
     else:
         expected_weekly_reading_rate = 35000  # Explicit default applied here
     #expected_weekly_reading_rate = data.get('expected_weekly_reading_rate') or (prev_data[2] if prev_data else 35000)
@@ -893,27 +2271,22 @@ def submit_data():
     else:
         expected_daily_reading_percent = None
 
-    accumulated_reading_percent = int(data.get('accumulated_reading_percent') or (prev_data[3] if prev_data else 0))
+    accumulated_reading_percent = int(data.get('accumulated_reading_percent') or prev['accumulated_reading_percent'] or 0)
     #daily_reading_percent = None if prev_data is None else (accumulated_reading_percent - prev_data[3])
-    daily_reading_percent = accumulated_reading_percent - int(prev_data[3] if prev_data else 0)
+    daily_reading_percent = accumulated_reading_percent - int(prev['accumulated_reading_percent'] or 0)
     accumulated_weekly_reading_percent = get_accumulated_weekly_reading_percent(user_id, date, daily_reading_percent)
 
-    with sqlite3.connect(DATABASE) as conn:
-        c = conn.cursor()
-        c.execute('''INSERT INTO daily_reports (
-            user_id, date, book_title, word_count, expected_weekly_reading_rate,
-            expected_weekly_reading_percent, expected_daily_reading_percent, accumulated_reading_percent,
-            daily_reading_percent, accumulated_weekly_reading_percent,
-            expected_math_points, actual_math_points, math_time
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', (
-            user_id, date, book_title, word_count, expected_weekly_reading_rate,
-            expected_weekly_reading_percent, expected_daily_reading_percent, accumulated_reading_percent,
-            daily_reading_percent, accumulated_weekly_reading_percent,
-            int(data.get('expected_math_points') or 0), int(data.get('actual_math_points') or 0), int(data.get('math_time') or 0)
-        ))
-        conn.commit()
-
-    return jsonify({'status':'success'}), 201
+    c.execute('''INSERT INTO daily_reports (
+        user_id, date, book_title, word_count, expected_weekly_reading_rate,
+        expected_weekly_reading_percent, expected_daily_reading_percent, accumulated_reading_percent,
+        daily_reading_percent, accumulated_weekly_reading_percent,
+        expected_math_points, actual_math_points, math_time
+    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', (
+        user_id, date, book_title, word_count, expected_weekly_reading_rate,
+        expected_weekly_reading_percent, expected_daily_reading_percent, accumulated_reading_percent,
+        daily_reading_percent, accumulated_weekly_reading_percent,
+        int(data.get('expected_math_points') or 0), int(data.get('actual_math_points') or 0), int(data.get('math_time') or 0)
+    ))
 
 @app.route('/previous-day-data/<int:user_id>/<date>', methods=['GET'])
 def previous_day_data(user_id, date):
@@ -927,44 +2300,592 @@ def previous_day_data(user_id, date):
     else:
         return jsonify({}), 200
 
+# Opt-in weekly progress payloads, chosen with ?format= or an Accept header
+# of application/vnd.hstracker.<format>+json; without either, responses keep
+# the original shape.  compact drops summary.effort (a copy of the top-level
+# effort); columnar is compact with dailyData as {field: [Mon..Sun values]}.
+PAYLOAD_FORMATS = ('compact', 'columnar')
+PAYLOAD_MIMETYPE = 'application/vnd.hstracker.{}+json'
+
+def _payload_format():
+    """The payload format the request asked for, or None; ValueError for an unknown ?format=."""
+    fmt = request.args.get('format')
+    if fmt is not None:
+        if fmt not in PAYLOAD_FORMATS:
+            raise ValueError(f"Unsupported format '{fmt}'. Use {' or '.join(PAYLOAD_FORMATS)}.")
+        return fmt
+    accepted = {mimetype for mimetype, quality in request.accept_mimetypes if quality > 0}
+    return next((fmt for fmt in PAYLOAD_FORMATS if PAYLOAD_MIMETYPE.format(fmt) in accepted), None)
+
+def _shape_weekly(data, fmt):
+    """Weekly progress data (or a range week) in payload format fmt; never modifies data."""
+    if fmt is None:
+        return data
+    data = {**data, 'summary': {k: v for k, v in data['summary'].items() if k != 'effort'}}
+    if fmt == 'columnar':
+        days = data['dailyData']
+        data['dailyData'] = {field: [day[field] for day in days] for field in (days[0] if days else ())}
+    return data
+
+def _formatted_json(data, fmt):
+    """jsonify(data), or for an opt-in format always-compact JSON with its vendor media type."""
+    if fmt is None:
+        response = jsonify(data)
+    else:
+        response = Response(app.json.dumps(data, separators=(',', ':')), mimetype=PAYLOAD_MIMETYPE.format(fmt))
+    response.vary.add('Accept')
+    return response
+
 @app.route('/admin/user/<int:user_id>/daily-report/<date>/weekly-progress', methods=['GET'])
 def get_weekly_progress(user_id, date):
     try:
+        fmt = _payload_format()
         # Call the helper function
         progress_data = _get_weekly_progress_data(user_id, date)
         # Return the result as JSON
-        return jsonify(progress_data), 200
+        return _formatted_json(_shape_weekly(progress_data, fmt), fmt), 200
     except ValueError as e:
         # Handle potential date format error from helper
         return jsonify({"error": str(e)}), 400
     except Exception as e:
         # Catch other unexpected errors during calculation
-        print(f"ERROR in get_weekly_progress for user {user_id}, date {date}: {e}") # Log error
-        # Optionally include traceback: import traceback; traceback.print_exc()
+        log.exception("Error in get_weekly_progress for user %s, date %s", user_id, date)
         return jsonify({"error": "An internal server error occurred processing weekly progress."}), 500
 
 @app.route('/weekly-progress/<int:user_id>/<date>', methods=['GET'])
 def get_student_weekly_progress(user_id, date):
     try:
+        fmt = _payload_format()
         # Call the SAME helper function
         progress_data = _get_weekly_progress_data(user_id, date)
         # Return the result as JSON
-        return jsonify(progress_data), 200
+        return _formatted_json(_shape_weekly(progress_data, fmt), fmt), 200
     except ValueError as e:
         # Handle potential date format error from helper
         return jsonify({"error": str(e)}), 400
     except Exception as e:
         # Catch other unexpected errors during calculation
-        print(f"ERROR in get_student_weekly_progress for user {user_id}, date {date}: {e}") # Log error
+        log.exception("Error in get_student_weekly_progress for user %s, date %s", user_id, date)
         return jsonify({"error": "An internal server error occurred processing weekly progress."}), 500
 
+@app.route('/weekly-progress/<int:user_id>/<start_date>/<end_date>', methods=['GET'])
+def get_weekly_progress_range(user_id, start_date, end_date):
+    try:
+        fmt = _payload_format()
+        data = _get_weekly_progress_range(user_id, start_date, end_date)
+        data['weeks'] = [_shape_weekly(week, fmt) for week in data['weeks']]
+        return _formatted_json(data, fmt), 200
+    except ValueError as e:
+        # bad date format, reversed range, range too long or unknown ?format=
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        log.exception("Error in get_weekly_progress_range for user %s, %s..%s", user_id, start_date, end_date)
+        return jsonify({"error": "An internal server error occurred processing weekly progress."}), 500
+
+@app.route('/weekly-summary/<int:user_id>/<date>', methods=['GET'])
+def get_weekly_summary(user_id, date):
+    """End-of-week totals and tier for date's week, straight from weekly_aggregates."""
+    try:
+        week = _week_monday(date).strftime('%Y-%m-%d')
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+    with get_db() as conn:
+        c = conn.cursor()
+        c.row_factory = sqlite3.Row
+        c.execute('SELECT * FROM weekly_aggregates WHERE user_id=? AND week=?', (user_id, week))
+        row = c.fetchone()
+    if not row:
+        return jsonify({'exists': False, 'week': week, 'summary': {}}), 200
+    summary = dict(row)
+    summary['tasks'] = json.loads(summary['tasks'])
+    return jsonify({'exists': True, 'week': week, 'summary': summary}), 200
+
+# Effort fields the cohort overview lists per student
+COHORT_EFFORT_FIELDS = ('math_pct', 'reading_pct', 'tasks_pct', 'overall_pct', 'tier', 'scope')
+
+def _cohort_effort(cursor, d, student_ids):
+    """{user_id: effort} for each student's week containing d, as of d.
+
+    The students' text tasks, plans, reading context and the week's daily
+    reports and custom values are each read with one query across all of
+    them; the weeks are then evaluated in memory by _compute_week_progress,
+    so the numbers match every student's own weekly progress.
+    """
+    if not student_ids:
+        return {}
+    monday = d - timedelta(days=d.weekday())
+    start, end = monday.strftime('%Y-%m-%d'), (monday + timedelta(days=6)).strftime('%Y-%m-%d')
+    ids = ','.join('?' * len(student_ids))
+
+    text_task_defs = {user_id: {} for user_id in student_ids}
+    cursor.execute(f'''
+        SELECT student_id, slug, label
+          FROM task_definitions
+         WHERE student_id IN ({ids}) AND field_type='text' AND is_default=0 AND is_active=1
+         ORDER BY created_at, id
+    ''', student_ids)
+    for user_id, slug, label in cursor.fetchall():
+        text_task_defs[user_id][slug] = label
+
+    plan_rows = {user_id: [] for user_id in student_ids}
+    cursor.execute(f'''
+        SELECT te.student_id, te.day_of_week, td.slug, te.value
+          FROM task_entries te JOIN task_definitions td ON td.id = te.task_def_id
+         WHERE te.student_id IN ({ids})
+    ''', student_ids)
+    for user_id, *row in cursor.fetchall():
+        plan_rows[user_id].append(row)
+
+    reports = {user_id: {} for user_id in student_ids}
+    cursor.execute(f'''
+        SELECT user_id, {', '.join(WEEKLY_ROW_FIELDS)}
+          FROM daily_reports
+         WHERE user_id IN ({ids}) AND date BETWEEN ? AND ?
+    ''', [*student_ids, start, end])
+    for user_id, *row in cursor.fetchall():
+        reports[user_id][row[0]] = dict(zip(WEEKLY_ROW_FIELDS, row))
+    cursor.execute(f'''
+        SELECT dr.user_id, dr.date, td.slug, v.value
+          FROM daily_reports dr
+          JOIN daily_task_values v ON v.report_id = dr.id
+          JOIN task_definitions td ON td.id = v.task_def_id
+         WHERE dr.user_id IN ({ids}) AND dr.date BETWEEN ? AND ?
+    ''', [*student_ids, start, end])
+    for user_id, date, slug, value in cursor.fetchall():
+        if slug in text_task_defs[user_id]:
+            reports[user_id][date][slug] = value
+
+    # reading context: each student's last report before Monday, plus
+    # whether they ever saved a rate (else the 35000 default applies)
+    cursor.execute(f'''
+        SELECT u.id, dr.id, dr.accumulated_reading_percent, dr.book_title,
+               dr.word_count, dr.expected_weekly_reading_rate,
+               (SELECT expected_weekly_reading_rate IS NOT NULL FROM carry_forward_state
+                 WHERE user_id = u.id ORDER BY valid_from DESC LIMIT 1)
+          FROM users u
+          LEFT JOIN daily_reports dr ON dr.id = (
+               SELECT id FROM daily_reports WHERE user_id = u.id AND date < ?
+                ORDER BY date DESC LIMIT 1)
+         WHERE u.id IN ({ids})
+    ''', [start, *student_ids])
+    contexts = cursor.fetchall()
+    thresholds = load_thresholds(cursor)
+
+    efforts = {}
+    for user_id, report_id, *context, ever_set in contexts:
+        last_row = dict(zip(('accumulated_reading_percent', 'book_title', 'word_count',
+                             'expected_weekly_reading_rate'), context)) if report_id else None
+        reading = _context_from_row(last_row, lambda: ever_set)
+        plan = _plan_from_rows(plan_rows[user_id], text_task_defs[user_id])
+        week_data, _ = _compute_week_progress(d, reports[user_id], plan, text_task_defs[user_id],
+                                              reading, thresholds)
+        efforts[user_id] = week_data['effort']
+    return efforts
+
+def _cohort_overview(cursor, d):
+    students = _student_users(cursor)
+    efforts = {}
+    if d.weekday() == 6 and students:
+        # as of Sunday a week's effort is its end-of-week row in weekly_aggregates;
+        # only students without one (no reports that week or since) are computed
+        cursor.execute(f'''
+            SELECT user_id, math_pct, reading_pct, tasks_pct, overall_pct, tier
+              FROM weekly_aggregates
+             WHERE week=? AND user_id IN ({','.join('?' * len(students))})
+        ''', [(d - timedelta(days=6)).strftime('%Y-%m-%d'), *(s['id'] for s in students)])
+        efforts = {row[0]: dict(zip(COHORT_EFFORT_FIELDS, (*row[1:], 'final')))
+                   for row in cursor.fetchall()}
+    efforts.update(_cohort_effort(cursor, d, [s['id'] for s in students if s['id'] not in efforts]))
+    return {
+        'week': (d - timedelta(days=d.weekday())).strftime('%Y-%m-%d'),
+        'date': d.strftime('%Y-%m-%d'),
+        'students': [{'user_id': s['id'], 'username': s['username'],
+                      **{field: efforts[s['id']][field] for field in COHORT_EFFORT_FIELDS}}
+                     for s in students],
+    }
+
+@app.route('/admin/cohort-overview/<date>', methods=['GET'])
+def cohort_overview(date):
+    """Effort summary (math/reading/tasks/overall pct and tier) of every student for date's week."""
+    try:
+        d = datetime.strptime(date, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+    # any write bumps the '*' generation, so it tags every student's week at once
+    return versioned_json(('*',), lambda cursor: _cohort_overview(cursor, d))
+
+def _result_streaks(cursor, user_ids):
+    """{user_id: {'current': {...}, 'longest': {tier: weeks}}} from weekly_results.
+
+    A streak is a run of consecutive weeks with the same tier; a week
+    without a result ends it.  'current' is the run holding the student's
+    latest result.
+    """
+    if not user_ids:
+        return {}
+    # gaps and islands: within a run, week number minus row number is constant
+    cursor.execute(f'''
+        SELECT user_id, tier, COUNT(*), MIN(week), MAX(week)
+          FROM (SELECT user_id, week, tier,
+                       CAST(julianday(week) AS INTEGER) / 7
+                         - ROW_NUMBER() OVER (PARTITION BY user_id, tier ORDER BY week) AS run
+                  FROM weekly_results
+                 WHERE user_id IN ({','.join('?' * len(user_ids))}))
+         GROUP BY user_id, tier, run
+    ''', list(user_ids))
+    streaks = {}
+    for user_id, tier, weeks, since, through in cursor.fetchall():
+        s = streaks.setdefault(user_id, {'current': None, 'longest': {}})
+        s['longest'][tier] = max(s['longest'].get(tier, 0), weeks)
+        if s['current'] is None or through > s['current']['through']:
+            s['current'] = {'tier': tier, 'weeks': weeks, 'since': since, 'through': through}
+    return streaks
+
+@app.route('/admin/weekly-results', methods=['GET'])
+def weekly_results_history():
+    """Weekly pct/tier history from weekly_results, keyset-paginated on (user_id, week).
+
+    ?user_id= limits it to one student, ?tier= (repeatable) to those tiers,
+    ?limit= sets the page size.  Pass a page's 'next' back as ?after= for the
+    following page.  Each page carries the streaks of the students on it.
+    """
+    user_id = request.args.get('user_id', type=int)
+    tiers = request.args.getlist('tier')
+    limit = request.args.get('limit', HISTORY_PAGE_SIZE, type=int)
+    if not 1 <= limit <= HISTORY_MAX_PAGE_SIZE:
+        return jsonify({"error": f"limit must be between 1 and {HISTORY_MAX_PAGE_SIZE}."}), 400
+    after = request.args.get('after')
+    if after:
+        try:
+            after_user, after_week = after.split(':', 1)
+            after = (int(after_user), datetime.strptime(after_week, '%Y-%m-%d').strftime('%Y-%m-%d'))
+        except ValueError:
+            return jsonify({"error": "after must be a 'next' value from a previous page."}), 400
+
+    where, params = [], []
+    if user_id is not None:
+        where.append('user_id = ?')
+        params.append(user_id)
+    if after:
+        where.append('(user_id, week) > (?, ?)')
+        params.extend(after)
+    if tiers:
+        where.append(f"tier IN ({','.join('?' * len(tiers))})")
+        params.extend(tiers)
+
+    def build(cursor):
+        cursor.execute(f'''
+            SELECT user_id, week, pct, tier
+              FROM weekly_results
+             {'WHERE ' + ' AND '.join(where) if where else ''}
+             ORDER BY user_id, week
+             LIMIT ?
+        ''', [*params, limit + 1])
+        rows = cursor.fetchall()
+        page = [{'user_id': r[0], 'week': r[1], 'pct': r[2], 'tier': r[3]} for r in rows[:limit]]
+        return {
+            'results': page,
+            'next': f"{page[-1]['user_id']}:{page[-1]['week']}" if len(rows) > limit else None,
+            'streaks': _result_streaks(cursor, sorted({r['user_id'] for r in page})),
+        }
+    # weekly_results only changes along with a progress:<user_id> bump
+    return versioned_json(('*',), build)
+
+def _reading_report(weeks):
+    return {'weeks': weeks, 'totals': {
+        'reading_percent': round(sum(w['reading_percent'] for w in weeks), 2),
+        'expected_reading_percent': sum(w['expected_reading_percent'] for w in weeks),
+        'words_read': sum(w['words_read'] for w in weeks),
+        'books_finished': sum(w['books_finished'] for w in weeks)}}
+
+@app.route('/admin/reading-analytics', methods=['GET'])
+def get_reading_analytics():
+    """Week-by-week reading (actual vs expected, words read, books finished) of every student.
+
+    ?user_id= (repeatable) limits it to those students.  Whole histories
+    are computed at once by reading_analytics.
+    """
+    user_ids = request.args.getlist('user_id', type=int) or None
+
+    def build(cursor):
+        analysis = reading_analytics.analyze(reading_analytics.load_history(cursor, user_ids))
+        return {'students': [{'user_id': user_id, **_reading_report(weeks)} for user_id, weeks
+                             in sorted(reading_analytics.weekly_summaries(analysis).items())]}
+    return versioned_json(('*',), build)
+
+@app.route('/admin/user/<int:user_id>/reading-analytics', methods=['GET'])
+def get_student_reading_analytics(user_id):
+    """One student's weekly reading analytics plus cumulative actual/expected curves per day."""
+    def build(cursor):
+        analysis = reading_analytics.analyze(reading_analytics.load_history(cursor, [user_id]))
+        weeks = reading_analytics.weekly_summaries(analysis).get(user_id, [])
+        return {'user_id': user_id, **_reading_report(weeks),
+                'curves': reading_analytics.daily_curves(analysis, user_id)}
+    return versioned_json((f'progress:{user_id}',), build)
+
+@app.route('/admin/weekly-aggregates/rebuild', methods=['POST'])
+def rebuild_weekly_aggregates_route():
+    # backfill for databases that predate weekly_aggregates / book_forecasts,
+    # and a repair for carry_forward_state (filled automatically when empty)
+    with get_db() as conn:
+        c = conn.cursor()
+        intervals = rebuild_carry_forward(c)
+        weeks = rebuild_weekly_aggregates(c)
+        forecasts = rebuild_book_forecasts(c)
+        conn.commit()
+    return jsonify({'status': 'success', 'weeks': weeks, 'forecasts': forecasts,
+                    'carry_forward_intervals': intervals}), 200
+
+@app.route('/admin/user/<int:user_id>/book-forecast', methods=['GET'])
+def get_book_forecast(user_id):
+    """When the current book will be finished, and the daily pace needed to finish on plan.
+
+    A primary-key lookup in book_forecasts, which every report write keeps
+    current; computed on the fly (not stored) for a database not yet backfilled.
+    """
+    def build(cursor):
+        cursor.execute(f'SELECT {", ".join(BOOK_FORECAST_COLUMNS)} FROM book_forecasts WHERE user_id=?',
+                       (user_id,))
+        row = cursor.fetchone()
+        forecast = dict(zip(BOOK_FORECAST_COLUMNS, row)) if row else _book_forecast(cursor, user_id)
+        if forecast is None:
+            return {'exists': False, 'forecast': {}}
+        words = forecast['word_count']
+        for pace in ('recent_pace', 'planned_pace', 'required_pace'):
+            # the same paces in words per day
+            forecast[pace.replace('_pace', '_words_per_day')] = (
+                round(forecast[pace] * words / 100) if words and forecast[pace] is not None else None)
+        return {'exists': True, 'forecast': forecast}
+    return versioned_json((f'progress:{user_id}',), build)
+
+# Built-in daily_reports columns in the order exports list them
+EXPORT_REPORT_COLUMNS = [
+    'book_title', 'word_count', 'expected_weekly_reading_rate',
+    'expected_weekly_reading_percent', 'expected_daily_reading_percent',
+    'accumulated_reading_percent', 'daily_reading_percent', 'accumulated_weekly_reading_percent',
+    'expected_math_points', 'actual_math_points', 'math_time',
+]
+EXPORT_WEEKLY_COLUMNS = [
+    'math_actual', 'math_expected', 'reading_actual', 'reading_expected',
+    'math_pct', 'reading_pct', 'tasks_pct', 'overall_pct', 'tier',
+]
+
+def _export_filters():
+    """(user_ids, start, end) from ?user_id=..&user_id=..&start=..&end=..
+
+    No user_id means every student; start/end default to the whole history.
+    Raises ValueError for malformed dates.
+    """
+    start = request.args.get('start') or '0001-01-01'
+    end = request.args.get('end') or '9999-12-31'
+    datetime.strptime(start, '%Y-%m-%d')
+    datetime.strptime(end, '%Y-%m-%d')
+    user_ids = request.args.getlist('user_id', type=int)
+    if not user_ids:
+        with get_db() as conn:
+            c = conn.cursor()
+            c.execute('SELECT id FROM users WHERE role="student" ORDER BY id')
+            user_ids = [row[0] for row in c.fetchall()]
+    return user_ids, start, end
+
+def _export_custom_columns(cursor, user_ids):
+    """Custom task slugs of these students, in order of first definition."""
+    placeholders = ','.join('?' * len(user_ids))
+    cursor.execute(f'''
+        SELECT td.slug
+          FROM task_definitions td
+         WHERE td.is_default=0 AND td.student_id IN ({placeholders})
+         GROUP BY td.slug
+         ORDER BY MIN(td.id)
+    ''', user_ids)
+    return [row[0] for row in cursor.fetchall()]
+
+def _export_select(columns, report='dr'):
+    """(select list, params) for columns of the daily_reports row aliased report.
+
+    Custom task slugs are pivoted out of daily_task_values, one correlated
+    primary-key lookup per slug, so the export still streams row by row.
+    """
+    select, params = [], []
+    for col in columns:
+        if col in REPORT_COLUMNS:
+            select.append(f'{report}."{col}"')
+        else:
+            select.append(f'''(SELECT v.value FROM daily_task_values v
+                                 JOIN task_definitions td ON td.id = v.task_def_id
+                                WHERE v.report_id = {report}.id AND td.slug = ?) AS "{col}"''')
+            params.append(col)
+    return ', '.join(select), params
+
+@app.route('/admin/export/daily-reports.xlsx', methods=['GET'])
+def export_daily_reports_xlsx():
+    """Workbook of daily reports and weekly summaries for students over a date range.
+
+    Rows are streamed from the cursor into XlsxWriter's constant_memory mode
+    and the workbook is assembled in a temporary file, so memory stays flat
+    however much history is exported.  Only a read transaction is held,
+    which under WAL never blocks writers in other workers.
+    """
+    try:
+        user_ids, start, end = _export_filters()
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+    placeholders = ','.join('?' * len(user_ids))
+
+    fd, path = tempfile.mkstemp(suffix='.xlsx')
+    os.close(fd)
+    try:
+        # cells hold student-entered text: never turn it into formulas or links
+        workbook = xlsxwriter.Workbook(path, {'constant_memory': True, 'strings_to_formulas': False,
+                                              'strings_to_urls': False})
+        bold = workbook.add_format({'bold': True})
+        date_format = workbook.add_format({'num_format': 'yyyy-mm-dd'})
+
+        with get_db() as conn:
+            c = conn.cursor()
+            custom_columns = _export_custom_columns(c, user_ids) if user_ids else []
+            columns = EXPORT_REPORT_COLUMNS + custom_columns
+
+            sheet = workbook.add_worksheet('Daily Reports')
+            sheet.freeze_panes(1, 0)
+            sheet.set_column(0, 1, 14)
+            sheet.write_row(0, 0, ['student', 'date'] + columns, bold)
+            select, select_params = _export_select(columns)
+            c.execute(f'''
+                SELECT u.username, dr.date, {select}
+                  FROM daily_reports dr JOIN users u ON u.id = dr.user_id
+                 WHERE dr.user_id IN ({placeholders}) AND dr.date BETWEEN ? AND ?
+                 ORDER BY dr.user_id, dr.date
+            ''', [*select_params, *user_ids, start, end])
+            for row_num, row in enumerate(c, start=1):
+                sheet.write_string(row_num, 0, row[0])
+                sheet.write_datetime(row_num, 1, datetime.strptime(row[1], '%Y-%m-%d'), date_format)
+                sheet.write_row(row_num, 2, row[2:])
+
+            sheet = workbook.add_worksheet('Weekly Summary')
+            sheet.freeze_panes(1, 0)
+            sheet.set_column(0, 1, 14)
+            sheet.write_row(0, 0, ['student', 'week'] + EXPORT_WEEKLY_COLUMNS, bold)
+            c.execute(f'''
+                SELECT u.username, wa.week, {', '.join(f'wa.{col}' for col in EXPORT_WEEKLY_COLUMNS)}
+                  FROM weekly_aggregates wa JOIN users u ON u.id = wa.user_id
+                 WHERE wa.user_id IN ({placeholders}) AND wa.week BETWEEN ? AND ?
+                 ORDER BY wa.user_id, wa.week
+            ''', [*user_ids, _week_monday(start).date().isoformat(), end])
+            for row_num, row in enumerate(c, start=1):
+                sheet.write_string(row_num, 0, row[0])
+                sheet.write_datetime(row_num, 1, datetime.strptime(row[1], '%Y-%m-%d'), date_format)
+                sheet.write_row(row_num, 2, row[2:])
+
+        workbook.close()
+        response = send_file(
+            path, as_attachment=True, download_name=f'daily-reports_{start}_{end}.xlsx',
+            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    except Exception:
+        os.remove(path)
+        raise
+    # direct passthrough bypasses close callbacks, so stream through the
+    # response iterator and delete the temporary workbook once it is sent
+    response.direct_passthrough = False
+    response.call_on_close(lambda: os.remove(path))
+    return response
+
+EXPORT_CHUNK_ROWS = 500      # rows fetched (and emitted) per chunk by streaming exports
+EXPORT_FORMATS = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+def _stream_query(sql, params, fmt, label):
+    """Yield the result of sql as CSV or NDJSON text, EXPORT_CHUNK_ROWS rows at a time.
+
+    Uses its own connection, since the generator keeps running after the
+    request context (and its teardown) is gone; label names its statements
+    in the slow-query log instead.
+    """
+    outer, _db_local.sql_label = getattr(_db_local, 'sql_label', None), label
+    try:
+        conn = _open_db()
+    except Exception:
+        _db_local.sql_label = outer
+        raise
+    try:
+        c = conn.cursor()
+        try:
+            c.execute(sql, params)
+        finally:
+            _db_local.sql_label = outer
+        columns = [col[0] for col in c.description]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if fmt == 'csv':
+            writer.writerow(columns)
+        while True:
+            rows = c.fetchmany(EXPORT_CHUNK_ROWS)
+            if not rows:
+                break
+            if fmt == 'csv':
+                writer.writerows(rows)
+            else:
+                buffer.writelines(json.dumps(dict(zip(columns, row))) + '\n' for row in rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue()    # CSV header of an empty result
+    finally:
+        conn.close()
+
+@app.route('/admin/export/<dataset>.<fmt>', methods=['GET'])
+def export_dataset(dataset, fmt):
+    """Stream daily-reports, task-entries or weekly-results as CSV or NDJSON.
+
+    Same filters as the XLSX export: ?user_id= (repeatable), ?start=, ?end=.
+    task-entries has no dates, so only the student filter applies to it.
+    """
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"error": f"Unsupported format '{fmt}'. Use csv or ndjson."}), 400
+    try:
+        user_ids, start, end = _export_filters()
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+    placeholders = ','.join('?' * len(user_ids))
+
+    if dataset == 'daily-reports':
+        with get_db() as conn:
+            columns = EXPORT_REPORT_COLUMNS + (_export_custom_columns(conn.cursor(), user_ids) if user_ids else [])
+        select, select_params = _export_select(columns)
+        sql = f'''
+            SELECT dr.user_id, dr.date, {select}
+              FROM daily_reports dr
+             WHERE dr.user_id IN ({placeholders}) AND dr.date BETWEEN ? AND ?
+             ORDER BY dr.user_id, dr.date
+        '''
+        params = [*select_params, *user_ids, start, end]
+    elif dataset == 'task-entries':
+        sql = f'''
+            SELECT te.student_id AS user_id, td.slug, te.day_of_week, te.value
+              FROM task_entries te JOIN task_definitions td ON td.id = te.task_def_id
+             WHERE te.student_id IN ({placeholders})
+             ORDER BY te.student_id, td.id, te.day_of_week
+        '''
+        params = user_ids
+    elif dataset == 'weekly-results':
+        sql = f'''
+            SELECT user_id, week, pct, tier
+              FROM weekly_results
+             WHERE user_id IN ({placeholders}) AND week BETWEEN ? AND ?
+             ORDER BY user_id, week
+        '''
+        params = [*user_ids, _week_monday(start).date().isoformat(), end]
+    else:
+        return jsonify({"error": f"Unknown dataset '{dataset}'."}), 404
+
+    return Response(_stream_query(sql, params, fmt, f'{request.endpoint} (streamed)'), mimetype=EXPORT_FORMATS[fmt], headers={
+        'Content-Disposition': f'attachment; filename={dataset}_{start}_{end}.{fmt}'})
+
 @app.route('/admin/tier-thresholds', methods=['GET'])
 def get_tier_thresholds():
-    with sqlite3.connect(DATABASE) as conn:
-        cur = conn.cursor()
-        cur.execute('SELECT needs_work_max, good_max FROM tier_thresholds WHERE id=1')
-        row = cur.fetchone() or (0.88, 0.98)
-    return jsonify({'needsWorkMax': row[0], 'goodMax': row[1]}), 200       
+    # set_tier_thresholds bumps 'thresholds' through invalidate_weekly_progress
+    return versioned_json(('thresholds',), lambda c: dict(
+        zip(('needsWorkMax', 'goodMax'), load_thresholds(c))))       
 
 @app.route('/admin/tier-thresholds', methods=['POST'])
 def set_tier_thresholds():
@@ -976,28 +2897,32 @@ def set_tier_thresholds():
     except (KeyError, ValueError, AssertionError):
         return jsonify({'status':'failure',
                         'message':'Both numbers must be greater than 0 and less than or equal to 1, and needsWork < good.'}), 400
-    with sqlite3.connect(DATABASE) as conn:
+    with get_db() as conn:
         cur = conn.cursor()
         cur.execute('UPDATE tier_thresholds SET needs_work_max=?, good_max=? WHERE id=1', (nw, gm))
+        invalidate_weekly_progress(cur)   # first, so the rebuild reads the new thresholds
+        rebuild_weekly_aggregates(cur)
         conn.commit()
     return jsonify({'status':'success'}), 200    
 
 @app.route('/admin/tier-messages', methods=['GET'])
 def get_tier_messages():
-    with sqlite3.connect(DATABASE) as conn:
-        cur = conn.cursor()
-        cur.execute("SELECT tier, scope, message FROM tier_messages")
-        rows = cur.fetchall()
-    out = {s: {} for s in ('progress','final')}
-    for tier, scope, msg in rows:
-        out[scope][tier] = msg
-    return jsonify(out), 200
+    return versioned_json(('tier_messages',), _tier_messages)
+
+def _tier_messages(cursor):
+    def load(c):
+        c.execute("SELECT tier, scope, message FROM tier_messages")
+        out = {s: {} for s in ('progress','final')}
+        for tier, scope, msg in c.fetchall():
+            out[scope][tier] = msg
+        return out
+    return cached_config(cursor, 'tier_messages', load)
 
 @app.route('/admin/tier-messages', methods=['POST'])
 def set_tier_messages():
     data = request.json or {}
     try:
-        with sqlite3.connect(DATABASE) as conn:
+        with get_db() as conn:
             cur = conn.cursor()
             for scope, tiers in data.items():
                 if scope not in ('progress','final'):  continue
@@ -1008,6 +2933,7 @@ def set_tier_messages():
                         VALUES (?,?,?)
                         ON CONFLICT(tier,scope) DO UPDATE SET message=excluded.message
                     """, (tier,scope,msg.strip()))
+            bump_cache_version(cur, 'tier_messages')
             conn.commit()
         return jsonify({'status':'success'}), 200
     except Exception as e:
@@ -1018,20 +2944,324 @@ def set_tier_messages():
 def public_tier_messages():
     return get_tier_messages()
 
+# ---- dashboard bootstrap -----------------------------------------
+def _bootstrap(user_id, date, admin=False):
+    """Everything the dashboard loads for (user, date), read in one snapshot.
+
+    All reads run on the request's connection inside a single deferred
+    read transaction, so the pieces are mutually consistent even while
+    saves land from other workers.  Task definitions and the carry-forward
+    fields are read once and shared between the daily report, last-known
+    data and weekly progress.
+    """
+    conn = get_db()
+    conn.execute('BEGIN')
+    try:
+        c = conn.cursor()
+        definitions = _task_definitions(c, user_id)
+        shown = [d for d in definitions if d['is_active'] or d['is_default']]
+        carried = get_last_explicit_fields(user_id, date, LAST_KNOWN_FIELDS)
+        thresholds = load_thresholds(c)
+
+        data = {
+            'tierMessages': _tier_messages(c),
+            'taskDefinitions': definitions,
+            'taskEntries': _task_entries(c, user_id),
+            'dailyReport': _daily_report(c, user_id, date,
+                                         [(d['slug'], d['field_type']) for d in shown], carried),
+            'lastKnownData': {field: value for field, (value, _) in carried.items()},
+            'weeklyProgress': _get_weekly_progress_data(
+                user_id, date,
+                text_task_defs={d['slug']: d['label'] for d in shown
+                                if d['field_type'] == 'text' and not d['is_default']},
+                thresholds=thresholds),
+        }
+        if admin:
+            data['tierThresholds'] = {'needsWorkMax': thresholds[0], 'goodMax': thresholds[1]}
+            data['users'] = _student_users(c)
+    finally:
+        conn.rollback()   # read-only: just release the snapshot
+    return data
+
+@app.route('/bootstrap/<int:user_id>/<date>', methods=['GET'])
+def student_bootstrap(user_id, date):
+    try:
+        datetime.strptime(date, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+    return _bootstrap_response(lambda: _bootstrap(user_id, date))
+
+@app.route('/admin/user/<int:user_id>/bootstrap/<date>', methods=['GET'])
+def admin_bootstrap(user_id, date):
+    try:
+        datetime.strptime(date, '%Y-%m-%d')
+    except ValueError:
+        return jsonify({"error": "Invalid date format. Use YYYY-MM-DD."}), 400
+    return _bootstrap_response(lambda: _bootstrap(user_id, date, admin=True))
+
+def _bootstrap_response(build):
+    try:
+        fmt = _payload_format()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    data = build()
+    data['weeklyProgress'] = _shape_weekly(data['weeklyProgress'], fmt)
+    return _formatted_json(data, fmt), 200
+
+
+# Representative statements issued by each endpoint, EXPLAINed by /admin/index-usage.
+# Dynamic column lists are represented by a typical member (book_title).
+# Task definitions are read through student_definitions(), so the
+# get_task_definitions statement is also the cache-miss path of the others.
+ENDPOINT_QUERIES = {
+    'login': ['SELECT id, role FROM users WHERE username=? AND password=?'],
+    'get_users': ['SELECT id, username FROM users WHERE role="student"'],
+    'get_task_definitions': [
+        'SELECT id, slug, label, field_type, readonly, is_default, is_active FROM task_definitions '
+        'WHERE student_id=? ORDER BY is_default DESC, created_at, id'],
+    'update_task_definitions': [
+        'SELECT id FROM task_definitions WHERE student_id=? AND is_default=0',
+        'DELETE FROM daily_task_values WHERE task_def_id IN (?)',
+        'DELETE FROM task_entries WHERE student_id=? AND task_def_id IN (?)',
+        'SELECT id FROM task_definitions WHERE student_id=? AND slug=?'],
+    'get_task_entries': [
+        'SELECT td.slug, te.day_of_week, te.value FROM task_entries te '
+        'JOIN task_definitions td ON td.id=te.task_def_id WHERE te.student_id=?'],
+    'update_task_entries': [
+        'SELECT id, slug, field_type FROM task_definitions WHERE student_id=?',
+        'SELECT task_def_id, day_of_week, value FROM task_entries WHERE student_id=?',
+        'DELETE FROM task_entries WHERE student_id=? AND task_def_id=? AND day_of_week=?'],
+    'get_daily_report': [
+        'SELECT id, "book_title" FROM daily_reports WHERE user_id=? AND date=?',
+        'SELECT dr.date, v.task_def_id, v.value FROM daily_reports dr '
+        'JOIN daily_task_values v ON v.report_id = dr.id WHERE dr.user_id=? AND dr.date BETWEEN ? AND ?',
+        CARRY_FORWARD_LOOKUP_SQL],
+    'update_daily_report': [
+        'SELECT date, id FROM daily_reports WHERE user_id=? AND date BETWEEN ? AND ?',
+        'DELETE FROM daily_task_values WHERE report_id=?',
+        CARRY_FORWARD_LOOKUP_SQL,
+        RATE_EVER_SET_SQL,
+        'DELETE FROM carry_forward_state WHERE user_id=? AND valid_from BETWEEN ? AND ?',
+        'SELECT date, book_title, word_count, expected_weekly_reading_rate, accumulated_reading_percent '
+        'FROM daily_reports WHERE user_id=? AND date BETWEEN ? AND ? AND (book_title IS NOT NULL '
+        'OR word_count IS NOT NULL OR expected_weekly_reading_rate IS NOT NULL '
+        'OR accumulated_reading_percent IS NOT NULL) ORDER BY date',
+        'UPDATE carry_forward_state SET book_title=?, book_title_date=? WHERE user_id=? AND valid_from > ? '
+        'AND (book_title_date IS NULL OR book_title_date <= ?)'],
+    'last_known_data': [CARRY_FORWARD_LOOKUP_SQL],
+    'submit_data': [
+        CARRY_FORWARD_LOOKUP_SQL,
+        'SELECT SUM(daily_reading_percent) FROM daily_reports WHERE user_id = ? AND date BETWEEN ? AND ?'],
+    'previous_day_data': [
+        'SELECT book_title, word_count, expected_weekly_reading_rate, accumulated_reading_percent '
+        'FROM daily_reports WHERE user_id=? AND date=?'],
+    'user_has_data': ['SELECT COUNT(*) FROM daily_reports WHERE user_id=?'],
+    'weekly_progress': [
+        'SELECT te.day_of_week, td.slug, te.value FROM task_entries te '
+        'JOIN task_definitions td ON td.id = te.task_def_id WHERE te.student_id=? AND td.slug IN (?, ?)',
+        'SELECT date, actual_math_points, book_title, day_ordinal FROM daily_reports '
+        'WHERE user_id=? AND day_ordinal BETWEEN ? AND ? ORDER BY day_ordinal ASC',
+        'SELECT accumulated_reading_percent, book_title, word_count, expected_weekly_reading_rate '
+        'FROM daily_reports WHERE user_id = ? AND day_ordinal <= ? ORDER BY day_ordinal DESC LIMIT 1',
+        RATE_EVER_SET_SQL],
+    'cohort_overview': [
+        'SELECT user_id, math_pct, overall_pct, tier FROM weekly_aggregates WHERE week=? AND user_id IN (?, ?)',
+        'SELECT user_id, date, actual_math_points FROM daily_reports '
+        'WHERE user_id IN (?, ?) AND date BETWEEN ? AND ?',
+        'SELECT u.id, dr.id FROM users u LEFT JOIN daily_reports dr ON dr.id = ('
+        'SELECT id FROM daily_reports WHERE user_id = u.id AND date < ? ORDER BY date DESC LIMIT 1) '
+        'WHERE u.id IN (?, ?)'],
+    'weekly_results_history': [
+        'SELECT user_id, week, pct, tier FROM weekly_results '
+        'WHERE user_id = ? AND (user_id, week) > (?, ?) ORDER BY user_id, week LIMIT ?',
+        'SELECT user_id, week, pct, tier FROM weekly_results '
+        'WHERE (user_id, week) > (?, ?) AND tier IN (?) ORDER BY user_id, week LIMIT ?'],
+}
+
+def explain_index_usage(conn, sql):
+    """Return the indexes SQLite's plan uses for sql, and any full table scans."""
+    c = conn.cursor()
+    c.execute(f'EXPLAIN QUERY PLAN {sql}', [None] * sql.count('?'))
+    indexes, scans = [], []
+    for _id, _parent, _unused, detail in c.fetchall():
+        m = re.search(r'USING (?:COVERING )?INDEX (\w+)', detail)
+        if m:
+            indexes.append(m.group(1))
+        elif 'USING INTEGER PRIMARY KEY' in detail:
+            indexes.append('INTEGER PRIMARY KEY')
+        elif 'USING PRIMARY KEY' in detail:      # WITHOUT ROWID table
+            indexes.append('PRIMARY KEY')
+        elif detail.startswith('SCAN ') and not detail.split()[1].startswith(('(', 'CONSTANT')):
+            scans.append(detail.split()[1])   # a real table, not a subquery/constant row
+    return {'indexes': sorted(set(indexes)), 'full_scans': sorted(set(scans))}
+
+@app.route('/admin/index-usage', methods=['GET'])
+def index_usage():
+    with get_db() as conn:
+        created = ensure_indexes(conn)
+        report = {}
+        for endpoint, queries in ENDPOINT_QUERIES.items():
+            report[endpoint] = [
+                {'sql': ' '.join(sql.split())[:120], **explain_index_usage(conn, sql)}
+                for sql in queries
+            ]
+    return jsonify({'created': created, 'endpoints': report}), 200
+
+
+@app.route('/admin/cache-stats', methods=['GET'])
+def cache_stats():
+    return jsonify({name: cache.stats() for name, cache in CACHES.items()}), 200
+
+@app.route('/admin/metrics', methods=['GET'])
+def get_metrics():
+    """This worker's request metrics as JSON, or Prometheus text.
+
+    Prometheus text is returned for ?format=prometheus, or when the Accept
+    header prefers text/plain (as a Prometheus scraper's does).
+    """
+    fmt = request.args.get('format')
+    best = request.accept_mimetypes.best_match(
+        ['application/json', 'text/plain', 'text/plain; version=0.0.4'])
+    if fmt is None and best and best.startswith('text/plain'):
+        fmt = 'prometheus'
+    if fmt == 'prometheus':
+        return Response(metrics.prometheus(), mimetype='text/plain; version=0.0.4')
+    return jsonify({**metrics.snapshot(),
+                    'caches': {name: cache.stats() for name, cache in CACHES.items()},
+                    'write_queue': write_queue.stats()}), 200
+
+
+# ---- frontend assets ---------------------------------------------
+# Build files whose names carry a content hash (main.3f2a1b4c.js) never change
+# under the same URL, so browsers may keep them for a year without asking again
+HASHED_ASSET = re.compile(r'\.[0-9a-f]{8,}\.')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+COMPRESS_MIN_BYTES = 1024
+COMPRESSIBLE_TYPES = {'application/javascript', 'application/json', 'application/manifest+json',
+                      'application/xml', 'image/svg+xml', 'text/javascript'}
+ASSET_TYPES = {'.map': 'application/json'}     # build outputs mimetypes does not know
+
+# Content-Encoding -> (file suffix, compress(bytes)), in order of preference
+ASSET_ENCODINGS = {'gzip': ('.gz', lambda data: gzip.compress(data, 9, mtime=0))}
+if brotli is not None:
+    ASSET_ENCODINGS = {'br': ('.br', lambda data: brotli.compress(data, quality=11)), **ASSET_ENCODINGS}
+
+class StaticAssets:
+    """Manifest of the frontend build directory, built on the first request it serves.
+
+    Every file is hashed for its ETag, and every compressible one gets a
+    gzip (and, with the brotli module, a brotli) variant.  Variants are
+    written next to the file (main.js.gz) and reused while newer than it, so
+    restarts and other workers skip the compression; each is written to a
+    temporary file and renamed into place, so a worker never serves another
+    one's half-written variant.  When the directory is read-only they are
+    kept in memory.  Serving is then a dict lookup: no filesystem checks per
+    request.  Rebuilding the frontend needs a restart.
+    """
+    def __init__(self, root):
+        self.root = root
+        self.assets = None    # relative path -> asset dict, once built
+        self._lock = threading.Lock()
+
+    def build(self):
+        assets = {}
+        if not self.root or not os.path.isdir(self.root):
+            self.assets = assets
+            return self
+        suffixes = tuple(suffix for suffix, _ in ASSET_ENCODINGS.values())
+        for folder, _, files in os.walk(self.root):
+            for name in files:
+                # variants, and other workers' variants still being written
+                if name.endswith(suffixes) or (name.startswith('.') and name.endswith('.tmp')):
+                    continue
+                path = os.path.join(folder, name)
+                rel = os.path.relpath(path, self.root).replace(os.sep, '/')
+                assets[rel] = self._asset(path, name)
+        self.assets = assets
+        log.info("Static asset manifest: %s files from %s", len(assets), self.root)
+        return self
+
+    def _asset(self, path, name):
+        with open(path, 'rb') as f:
+            data = f.read()
+        mimetype = (ASSET_TYPES.get(os.path.splitext(name)[1])
+                    or mimetypes.guess_type(name)[0] or 'application/octet-stream')
+        asset = {
+            'path': path,
+            'mimetype': mimetype,
+            'etag': hashlib.sha1(data).hexdigest()[:20],
+            'cache_control': IMMUTABLE_CACHE_CONTROL if HASHED_ASSET.search(name) else 'no-cache',
+            'variants': {},   # encoding -> path or bytes
+        }
+        if len(data) < COMPRESS_MIN_BYTES or not (mimetype.startswith('text/') or mimetype in COMPRESSIBLE_TYPES):
+            return asset
+        mtime = os.path.getmtime(path)
+        for encoding, (suffix, compress) in ASSET_ENCODINGS.items():
+            variant = path + suffix
+            if os.path.isfile(variant) and os.path.getmtime(variant) >= mtime:
+                asset['variants'][encoding] = variant
+                continue
+            compressed = compress(data)
+            if len(compressed) >= len(data):
+                continue
+            try:
+                fd, tmp = tempfile.mkstemp(prefix=f'.{name}.', suffix='.tmp', dir=os.path.dirname(path))
+                try:
+                    with os.fdopen(fd, 'wb') as f:
+                        f.write(compressed)
+                    os.replace(tmp, variant)
+                except OSError:
+                    os.unlink(tmp)
+                    raise
+                asset['variants'][encoding] = variant
+            except OSError:
+                asset['variants'][encoding] = compressed
+        return asset
+
+    def response(self, rel):
+        """Response for the asset at rel (conditional and content-negotiated), or None if unknown."""
+        if self.assets is None:
+            with self._lock:
+                if self.assets is None:
+                    self.build()
+        asset = self.assets.get(rel)
+        if asset is None:
+            return None
+        encoding = next((e for e in asset['variants'] if request.accept_encodings[e]), None)
+        etag = asset['etag'] + (f'-{encoding}' if encoding else '')
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            body = asset['variants'][encoding] if encoding else asset['path']
+            if isinstance(body, bytes):
+                response = Response(body, mimetype=asset['mimetype'])
+            else:
+                response = send_file(body, mimetype=asset['mimetype'], conditional=False, etag=False)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = asset['cache_control']
+        if asset['variants']:
+            response.vary.add('Accept-Encoding')
+        return response
+
+# built lazily, so importing app (scripts, every worker) neither hashes the
+# build nor writes compressed variants into it
+static_assets = StaticAssets(app.static_folder)
 
 # Serve React frontend
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve(path):
-    if path != "" and os.path.exists(app.static_folder + '/' + path):
-        return send_from_directory(app.static_folder, path)
-    else:
-        return send_from_directory(app.static_folder, 'index.html')
+    # unknown paths are client-side routes: the app shell handles them
+    response = static_assets.response(path) or static_assets.response('index.html')
+    if response is None:
+        abort(404)        # no frontend build
+    return response
 
 # --- ADD NEW ENDPOINT HERE ---
 @app.route('/admin/task-definition/<int:definition_id>/set-active-status', methods=['POST'])
 def set_task_definition_active_status(definition_id):
-    print("Inside set_task_definition_active_status") 
     data = request.json
     new_status = data.get('is_active')
 
@@ -1039,21 +3269,27 @@ def set_task_definition_active_status(definition_id):
         return jsonify({'status': 'failure', 'message': 'Invalid or missing is_active status. Must be true or false.'}), 400
 
     try:
-        with sqlite3.connect(DATABASE) as conn:
+        with get_db() as conn:
             c = conn.cursor()
             c.execute('''
                 UPDATE task_definitions
                 SET is_active = ?
                 WHERE id = ?
             ''', (1 if new_status else 0, definition_id))
-            conn.commit()
 
             if c.rowcount == 0:
                 return jsonify({'status': 'failure', 'message': 'Task definition not found.'}), 404
+
+            c.execute('SELECT student_id FROM task_definitions WHERE id = ?', (definition_id,))
+            student_id = c.fetchone()[0]
+            bump_cache_version(c, f'definitions:{student_id}')
+            refresh_weekly_aggregates(c, student_id)
+            invalidate_weekly_progress(c, student_id)
+            conn.commit()
             
         return jsonify({'status': 'success', 'message': f'Task definition {definition_id} status set to {"active" if new_status else "inactive"}.'}), 200
     except Exception as e:
-        print(f"Error updating task definition active status: {e}") # For server-side logging
+        log.exception("Error updating task definition active status")
         return jsonify({'status': 'failure', 'message': 'An error occurred while updating the task status.'}), 500
 
 if __name__ == '__main__':
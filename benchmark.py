@@ -0,0 +1,158 @@
+"""Benchmark the hot endpoints against a realistic database.
+
+    python benchmark.py                          # generate a fresh database in a temp dir
+    python benchmark.py --db bench.db            # run against a copy of an existing one
+    python benchmark.py --save-baseline          # record the results as the new baseline
+
+Each scenario drives the Flask test client through one endpoint with random
+(student, date) pairs from a fixed seed, so runs are comparable.  Latency is
+measured around the test-client call; SQL statements per request come from the
+app's own request metrics.  Results are compared against the stored baseline:
+a percentile more than --tolerance (and at least --min-delta-ms) slower, or
+any increase in statements per request, counts as a regression and the exit
+status is 1.
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+import generate_data
+
+SCENARIOS = ['login', 'get_daily_report', 'update_daily_report', 'weekly_progress', 'last_known_data']
+LATENCY_KEYS = ['p50_ms', 'p95_ms', 'p99_ms']
+
+def _percentile(samples, q):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+def _request(scenario, rng, students, first, last):
+    """(method, url, json body) for one randomised request of the scenario."""
+    if scenario == 'login':
+        return 'POST', '/login', {'username': 'admin', 'password': 'adminpass'}
+    user_id = rng.choice(students)
+    day = (first + timedelta(days=rng.randint(0, (last - first).days))).isoformat()
+    if scenario == 'get_daily_report':
+        return 'GET', f'/admin/user/{user_id}/daily-report/{day}', None
+    if scenario == 'update_daily_report':
+        return 'POST', f'/admin/user/{user_id}/daily-report/{day}', {
+            'actual_math_points': rng.randint(0, 12), 'math_time': rng.randint(10, 45)}
+    if scenario == 'weekly_progress':
+        return 'GET', f'/weekly-progress/{user_id}/{day}', None
+    return 'GET', f'/last-known-data/{user_id}/{day}', None
+
+def run(app, scenarios, requests, warmup, seed):
+    """{scenario: {p50_ms, p95_ms, p99_ms, mean_ms, queries_per_request}}."""
+    client = app.app.test_client()
+    with app.get_db() as conn:
+        students = [row[0] for row in conn.execute("SELECT id FROM users WHERE role = 'student'")]
+        first, last = conn.execute('SELECT MIN(date), MAX(date) FROM daily_reports').fetchone()
+    if not students or first is None:
+        raise SystemExit("The database has no students with daily reports")
+    first, last = date.fromisoformat(first), date.fromisoformat(last)
+
+    results = {}
+    for scenario in scenarios:
+        rng = random.Random(f'{seed}-{scenario}')
+        for _ in range(warmup):
+            method, url, body = _request(scenario, rng, students, first, last)
+            client.open(url, method=method, json=body)
+        app.metrics = app.RequestMetrics()
+        samples = []
+        for _ in range(requests):
+            method, url, body = _request(scenario, rng, students, first, last)
+            started = time.perf_counter()
+            response = client.open(url, method=method, json=body)
+            samples.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                raise SystemExit(f"{method} {url} failed with {response.status_code}: {response.get_data(True)}")
+        endpoints = app.metrics.snapshot()['endpoints']
+        results[scenario] = {
+            'p50_ms': round(1000 * _percentile(samples, 0.50), 3),
+            'p95_ms': round(1000 * _percentile(samples, 0.95), 3),
+            'p99_ms': round(1000 * _percentile(samples, 0.99), 3),
+            'mean_ms': round(1000 * statistics.fmean(samples), 3),
+            'queries_per_request': round(sum(e['sql_statements_per_request'] * e['count']
+                                             for e in endpoints.values()) / requests, 2),
+        }
+    return results
+
+def compare(results, baseline, tolerance, min_delta_ms=0.0):
+    """Regression messages for results that are worse than the baseline."""
+    regressions = []
+    for scenario, current in results.items():
+        before = baseline.get(scenario)
+        if not before:
+            continue
+        for key in LATENCY_KEYS:
+            if key in before and current[key] > max(before[key] * (1 + tolerance),
+                                                    before[key] + min_delta_ms):
+                regressions.append(f"{scenario}: {key} {current[key]} ms vs baseline {before[key]} ms")
+        if current['queries_per_request'] > before.get('queries_per_request', float('inf')):
+            regressions.append(f"{scenario}: {current['queries_per_request']} queries per request "
+                               f"vs baseline {before['queries_per_request']}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--db', help='existing database to benchmark (a copy is used)')
+    parser.add_argument('--students', type=int, default=20, help='students to generate when --db is not given')
+    parser.add_argument('--years', type=float, default=2, help='years of reports to generate when --db is not given')
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per scenario')
+    parser.add_argument('--warmup', type=int, default=20, help='unmeasured requests per scenario')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS,
+                        help='run only this scenario (repeatable)')
+    parser.add_argument('--baseline', default=os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                                           'benchmark_baseline.json'))
+    parser.add_argument('--save-baseline', action='store_true', help='write the results to --baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='allowed latency slowdown over the baseline (0.25 = 25%%)')
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help='ignore latency differences smaller than this (timer noise)')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'bench.db')
+        if args.db:
+            with sqlite3.connect(args.db) as src, sqlite3.connect(path) as dst:
+                src.backup(dst)
+        else:
+            generate_data.generate(path, students=args.students, years=args.years, seed=args.seed)
+        os.environ['HSTRACKER_DB'] = path
+        import app
+        app.DATABASE = path
+        app.log.setLevel('WARNING')
+        results = run(app, args.scenario or SCENARIOS, args.requests, args.warmup, args.seed)
+        app.close_db()
+
+    print(f"{'scenario':<22}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'mean ms':>10}{'queries':>10}")
+    for scenario, r in results.items():
+        print(f"{scenario:<22}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}{r['p99_ms']:>10.2f}"
+              f"{r['mean_ms']:>10.2f}{r['queries_per_request']:>10.2f}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to record one")
+        return 0
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.tolerance, args.min_delta_ms)
+    for message in regressions:
+        print(f"REGRESSION {message}")
+    if not regressions:
+        print("No regressions against the baseline")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+"""Build a synthetic homeschool_tracker database for benchmarking.
+
+    python generate_data.py bench.db --students 20 --years 3 --custom-tasks 3
+
+The schema comes from init_db.  Students, task definitions and weekly plans
+(task_entries) are created through the app's own endpoints; years of daily
+reports are then bulk-inserted with realistic reading and math progress, and
+the carry-forward state, weekly aggregates and book forecasts are rebuilt so
+the database looks like one the app has been writing to all along.
+"""
+import argparse
+import os
+import random
+from datetime import date, timedelta
+
+import init_db
+
+CUSTOM_TASKS = ['Piano Practice', 'Spelling', 'Journal', 'Chores', 'Science Lab',
+                'Art', 'Coding', 'Latin', 'Typing', 'Handwriting']
+BOOK_TITLES = ['The Hobbit', 'Dune', 'Matilda', 'Holes', 'Wonder', 'Hatchet', 'Coraline',
+               'The Giver', 'Redwall', 'Watership Down', 'Treasure Island', 'Heidi']
+FULL_WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+REPORT_COLUMNS = ['user_id', 'date', 'book_title', 'word_count', 'expected_weekly_reading_rate',
+                  'expected_daily_reading_percent', 'accumulated_reading_percent',
+                  'actual_math_points', 'math_time']
+
+def _weekly_plan(rng, slugs):
+    """task_entries payload: math points Monday-Friday, each custom task on a few days."""
+    plan = {day: {'expected_math_points': str(rng.randint(6, 12))} for day in FULL_WEEKDAYS[:5]}
+    for slug in slugs:
+        for day in rng.sample(FULL_WEEKDAYS, rng.randint(2, 5)):
+            plan.setdefault(day, {})[slug] = 'yes'
+    return plan
+
+def _daily_reports(app, rng, user_id, start, end, slugs, plan):
+    """(daily_reports rows, {date: {slug: value}}) for one student from start to end.
+
+    Most weekdays and some weekend days have a report.  Reading advances at
+    roughly the weekly rate until the book is finished, then a new one starts;
+    the title is only saved on the day a book starts, like the app's sticky
+    fields.  Planned custom tasks are usually done.
+    """
+    rows, custom = [], {}
+    rate = rng.choice([20000, 25000, 30000, 35000, 40000])
+    title, word_count, percent, new_book = None, None, 0.0, True
+    day = start
+    while day <= end:
+        weekday = FULL_WEEKDAYS[day.weekday()]
+        if rng.random() < (0.6 if day.weekday() >= 5 else 0.1):
+            day += timedelta(days=1)
+            continue
+        if new_book:
+            title = rng.choice(BOOK_TITLES)
+            word_count = rng.randrange(30000, 180000, 500)
+            percent, new_book = 0.0, False
+        percent_before = percent
+        percent = min(100.0, round(percent + 100.0 * rate / word_count / 7 * rng.uniform(0.4, 1.6), 1))
+        math_planned = int(plan.get(weekday, {}).get('expected_math_points', 0))
+        rows.append((user_id, day.isoformat(), title if percent_before == 0 else None,
+                     word_count, rate, app.expected_daily_reading_percent(rate, word_count), percent,
+                     max(0, math_planned + rng.randint(-4, 3)) if math_planned else rng.randint(0, 3),
+                     rng.randint(10, 45)))
+        done = {slug: 'done' for slug in slugs
+                if plan.get(weekday, {}).get(slug) and rng.random() < 0.8}
+        if done:
+            custom[day.isoformat()] = done
+        if percent >= 100:
+            new_book = True
+        day += timedelta(days=1)
+    return rows, custom
+
+def generate(path, students=10, years=2, custom_tasks=3, seed=1, end=None):
+    """Create the database at path (which must not exist yet); returns the student ids."""
+    if os.path.exists(path):
+        raise FileExistsError(f"{path} already exists")
+    init_db.DATABASE = path
+    init_db.init_db()
+
+    os.environ['HSTRACKER_DB'] = path
+    import app
+    app.DATABASE = path          # in case app was imported for another database
+    client = app.app.test_client()
+    rng = random.Random(seed)
+    end = end or date.today()
+    start = end - timedelta(days=round(365.25 * years))
+
+    student_ids = []
+    conn = app.get_db()
+    c = conn.cursor()
+    for n in range(1, students + 1):
+        user_id = client.post('/admin/add-user', json={
+            'username': f'student{n}', 'password': 'password'}).get_json()['newUserId']
+        defs = client.get(f'/admin/user/{user_id}/task-definitions').get_json()
+        labels = rng.sample(CUSTOM_TASKS, min(custom_tasks, len(CUSTOM_TASKS)))
+        defs = client.post(f'/admin/user/{user_id}/task-definitions', json=defs + [
+            {'label': label, 'field_type': 'text'} for label in labels]).get_json()
+        slugs = [d['slug'] for d in defs if not d['is_default']]
+        plan = _weekly_plan(rng, slugs)
+        client.post(f'/admin/user/{user_id}/task-entries', json=plan)
+
+        rows, custom = _daily_reports(app, rng, user_id, start, end, slugs, plan)
+        c.executemany(f'''
+            INSERT INTO daily_reports ({', '.join(REPORT_COLUMNS)})
+            VALUES ({', '.join('?' * len(REPORT_COLUMNS))})
+        ''', rows)
+        app.save_task_values(c, user_id, custom)
+        student_ids.append(user_id)
+
+    app.rebuild_carry_forward(c)
+    app.rebuild_weekly_aggregates(c)
+    app.rebuild_book_forecasts(c)
+    app.invalidate_weekly_progress(c)
+    conn.commit()
+    app.close_db()
+    return student_ids
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('path', help='database file to create')
+    parser.add_argument('--students', type=int, default=10)
+    parser.add_argument('--years', type=float, default=2, help='years of daily reports per student')
+    parser.add_argument('--custom-tasks', type=int, default=3, help='custom text tasks per student')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    ids = generate(args.path, args.students, args.years, args.custom_tasks, args.seed)
+    print(f"Generated {len(ids)} students with {args.years} years of reports in {args.path}")
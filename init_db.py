@@ -1,7 +1,325 @@
 import sqlite3
+import logging
 
 DATABASE = 'homeschool_tracker.db'
 
+log = logging.getLogger('hstracker')
+
+# Columns created with daily_reports.  Custom task values live in
+# daily_task_values; any other column is a leftover of the old per-slug
+# storage (ALTER TABLE ... ADD COLUMN), see migrate_custom_columns().
+DAILY_REPORT_BASE_COLUMNS = {
+    'id', 'user_id', 'date',
+    'book_title', 'word_count', 'expected_weekly_reading_rate',
+    'expected_weekly_reading_percent', 'expected_daily_reading_percent',
+    'accumulated_reading_percent', 'daily_reading_percent',
+    'accumulated_weekly_reading_percent',
+    'expected_math_points', 'actual_math_points', 'math_time',
+}
+
+# "Sticky" daily_reports columns: a day without a value carries the last
+# saved one forward (resolved through carry_forward_state)
+CARRY_FORWARD_FIELDS = ('book_title', 'word_count', 'expected_weekly_reading_rate',
+                        'accumulated_reading_percent')
+
+# Integer calendar columns derived from daily_reports.date.  They are virtual
+# generated columns, so SQLite keeps them in sync with date on every write:
+# day_ordinal is datetime.date.toordinal() (day 1, 0001-01-01, was a Monday)
+# and iso_week is the ISO year * 100 + ISO week number (2026-10-14 -> 202642),
+# from the year and day of year of the week's Thursday.
+_ISO_THURSDAY = "julianday(date) + 3 - (CAST(strftime('%w', date) AS INTEGER) + 6) % 7"
+DAY_COLUMNS = {
+    'day_ordinal': "CAST(julianday(date) - 1721424.5 AS INTEGER)",
+    'iso_week': (f"CAST(strftime('%Y', {_ISO_THURSDAY}) AS INTEGER) * 100"
+                 f" + (CAST(strftime('%j', {_ISO_THURSDAY}) AS INTEGER) + 6) / 7"),
+}
+
+# Fixed secondary indexes: name -> (table, column list, partial-index WHERE or None)
+INDEXES = {
+    # week and range scans: WHERE user_id=? AND day_ordinal BETWEEN ? AND ?
+    'idx_daily_reports_user_day': ('daily_reports', 'user_id, day_ordinal', None),
+    # duplicate-slug check and slug lookups
+    'idx_task_definitions_student_slug': ('task_definitions', 'student_id, slug', None),
+    # WHERE student_id=? AND (is_active=1 OR is_default=1) ORDER BY ... created_at
+    'idx_task_definitions_student_active': ('task_definitions', 'student_id, is_active, is_default, created_at', None),
+    # reward history pages: covering, so keyset scans on (user_id, week) never touch the table
+    'idx_weekly_results_history': ('weekly_results', 'user_id, week, tier, pct', None),
+}
+
+# Unique key of a weekly plan cell, (student_id, task_def_id, day_of_week).  It
+# replaces the plain idx_task_entries_student_def_day index on the same
+# columns and also serves WHERE te.student_id=? joined on te.task_def_id.
+TASK_ENTRIES_KEY = 'idx_task_entries_cell'
+
+# PRAGMA user_version once custom task columns have moved to daily_task_values
+CUSTOM_VALUES_SCHEMA_VERSION = 1
+
+def _managed_indexes(c):
+    """Every index ensure_indexes() maintains."""
+    wanted = dict(INDEXES)
+    # partial (user_id, date) index per sticky column, so a "last row where
+    # <col> IS NOT NULL" scan (book forecasts) never steps over NULL rows
+    for col in CARRY_FORWARD_FIELDS:
+        wanted[f'idx_daily_reports_{col}_set'] = ('daily_reports', 'user_id, date', f'"{col}" IS NOT NULL')
+    return wanted
+
+def ensure_indexes(conn):
+    """Create any missing managed index.
+
+    Safe to call repeatedly; returns the names of indexes it had to create.
+    Tables that do not exist yet are skipped.
+    """
+    c = conn.cursor()
+    c.execute("SELECT name FROM sqlite_master WHERE type='table'")
+    tables = {row[0] for row in c.fetchall()}
+    c.execute("SELECT name FROM sqlite_master WHERE type='index'")
+    existing = {row[0] for row in c.fetchall()}
+
+    created = []
+    if 'daily_reports' not in tables:
+        return created
+    for name, (table, columns, where) in _managed_indexes(c).items():
+        if name in existing or table not in tables:
+            continue
+        c.execute(f'CREATE INDEX IF NOT EXISTS "{name}" ON {table}({columns})'
+                  + (f' WHERE {where}' if where else ''))
+        created.append(name)
+    if created:
+        c.execute('PRAGMA optimize')
+    return created
+
+def migrate_custom_columns(conn):
+    """Move custom task values from per-slug daily_reports columns to daily_task_values.
+
+    Runs once per database (tracked with PRAGMA user_version).  Each value
+    goes to the task definition with the column's slug for the report's
+    student.  A column is dropped once all of its values have moved; one
+    holding values no current definition claims is kept and reported.
+    Returns the names of the columns that were moved.
+    """
+    c = conn.cursor()
+    c.execute('PRAGMA user_version')
+    if c.fetchone()[0] >= CUSTOM_VALUES_SCHEMA_VERSION:
+        return []
+    c.execute("SELECT name FROM sqlite_master WHERE type='table'")
+    if not {'daily_reports', 'task_definitions', 'daily_task_values'} <= {row[0] for row in c.fetchall()}:
+        return []
+    if not conn.in_transaction:
+        c.execute('BEGIN IMMEDIATE')      # one worker migrates, the others wait and skip
+        c.execute('PRAGMA user_version')
+        if c.fetchone()[0] >= CUSTOM_VALUES_SCHEMA_VERSION:
+            conn.commit()
+            return []
+
+    c.execute("SELECT name FROM pragma_table_info('daily_reports')")
+    custom = [row[0] for row in c.fetchall() if row[0] not in DAILY_REPORT_BASE_COLUMNS]
+    moved = []
+    for col in custom:
+        c.execute(f'''
+            INSERT OR IGNORE INTO daily_task_values (report_id, task_def_id, value)
+            SELECT dr.id, td.id, dr."{col}"
+              FROM daily_reports dr
+              JOIN task_definitions td ON td.student_id = dr.user_id AND td.slug = ?
+             WHERE dr."{col}" IS NOT NULL
+        ''', (col,))
+        c.execute(f'''
+            SELECT COUNT(*) FROM daily_reports dr
+             WHERE dr."{col}" IS NOT NULL
+               AND NOT EXISTS (SELECT 1 FROM task_definitions td
+                                WHERE td.student_id = dr.user_id AND td.slug = ?)
+        ''', (col,))
+        stranded = c.fetchone()[0]
+        if stranded:
+            log.warning("Kept daily_reports column %s: %s value(s) have no task definition", col, stranded)
+            continue
+        if sqlite3.sqlite_version_info >= (3, 35, 0):    # DROP COLUMN support
+            c.execute(f'DROP INDEX IF EXISTS "idx_daily_reports_{col}_set"')
+            c.execute(f'ALTER TABLE daily_reports DROP COLUMN "{col}"')
+        moved.append(col)
+    c.execute(f'PRAGMA user_version = {CUSTOM_VALUES_SCHEMA_VERSION}')
+    if moved:
+        log.info("Moved custom task columns to daily_task_values: %s", moved)
+    return moved
+
+def ensure_schema(conn):
+    """Create tables added after the original schema, migrate, then the managed indexes.
+
+    Run by init_db() and once per process by the app, so existing databases
+    pick up new tables without re-running init_db.
+    """
+    c = conn.cursor()
+    # Per-scope change counters ('progress:<user_id>', 'thresholds', ...), bumped
+    # inside write transactions so every worker can tell its caches are stale
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS cache_versions (
+        scope    TEXT PRIMARY KEY,
+        version  INTEGER NOT NULL DEFAULT 0
+    );
+    ''')
+
+    # Materialized end-of-week result per student, kept current by every
+    # daily report write (see refresh_weekly_aggregates in app.py)
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS weekly_aggregates (
+        user_id           INTEGER NOT NULL,
+        week              TEXT    NOT NULL,     -- Monday date
+        math_actual       INTEGER NOT NULL DEFAULT 0,
+        math_expected     INTEGER NOT NULL DEFAULT 0,
+        reading_actual    REAL    NOT NULL DEFAULT 0,
+        reading_expected  REAL    NOT NULL DEFAULT 0,
+        tasks             TEXT    NOT NULL DEFAULT '{}',   -- JSON {slug: {"planned": n, "done": n}}
+        math_pct          REAL,
+        reading_pct       REAL,
+        tasks_pct         REAL,
+        overall_pct       REAL,
+        tier              TEXT    NOT NULL,
+        updated_at        DATETIME DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY(user_id, week),
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    );
+    ''')
+
+    # Custom task values, one row per (daily report, task definition).  The
+    # value column is untyped so numbers and text keep their stored type.
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS daily_task_values (
+        report_id    INTEGER NOT NULL,
+        task_def_id  INTEGER NOT NULL,
+        value,
+        PRIMARY KEY(report_id, task_def_id),
+        FOREIGN KEY(report_id)   REFERENCES daily_reports(id),
+        FOREIGN KEY(task_def_id) REFERENCES task_definitions(id)
+    ) WITHOUT ROWID;
+    ''')
+    # Forecast for each student's current book, rewritten by every daily
+    # report write (see refresh_book_forecast in app.py).  Paces are in
+    # percent of the book per day.
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS book_forecasts (
+        user_id           INTEGER PRIMARY KEY,
+        book_title        TEXT,
+        started_on        TEXT    NOT NULL,     -- first report of the book
+        as_of             TEXT    NOT NULL,     -- latest report
+        percent           REAL    NOT NULL,
+        word_count        INTEGER,
+        weekly_rate       INTEGER,
+        recent_pace       REAL,                 -- over the last FORECAST_WINDOW_DAYS
+        planned_pace      REAL,                 -- from weekly_rate / word_count
+        projected_finish  TEXT,                 -- at recent_pace
+        planned_finish    TEXT,                 -- at planned_pace from started_on
+        required_pace     REAL,                 -- to still finish by planned_finish
+        finished_on       TEXT,
+        updated_at        DATETIME DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(user_id) REFERENCES users(id)
+    );
+    ''')
+    # Effective sticky values per student, one interval per date a report
+    # saved any of them: the row with the latest valid_from <= d holds each
+    # field's last explicitly saved value on or before d, and the date it was
+    # saved.  Kept current by every daily report write (see
+    # refresh_carry_forward in app.py).  Value columns are untyped so they
+    # keep the type daily_reports stored.
+    c.execute(f'''
+    CREATE TABLE IF NOT EXISTS carry_forward_state (
+        user_id     INTEGER NOT NULL,
+        valid_from  TEXT    NOT NULL,
+        {', '.join(f'{field}, {field}_date TEXT' for field in CARRY_FORWARD_FIELDS)},
+        PRIMARY KEY(user_id, valid_from)
+    ) WITHOUT ROWID;
+    ''')
+    migrate_custom_columns(conn)
+    ensure_task_entries_key(conn)
+    add_day_columns(conn)
+    backfill_carry_forward_state(conn)
+    return ensure_indexes(conn)
+
+def ensure_task_entries_key(conn):
+    """Create the unique key on task_entries cells; True if it had to be created.
+
+    Duplicate cells left by older saves are removed first (the most recently
+    inserted row of each cell is kept), then the key replaces the old
+    non-unique index.
+    """
+    c = conn.cursor()
+    c.execute("SELECT type, name FROM sqlite_master WHERE type IN ('table', 'index')")
+    names = {row[1] for row in c.fetchall()}
+    if 'task_entries' not in names or TASK_ENTRIES_KEY in names:
+        return False
+    c.execute('''
+        DELETE FROM task_entries
+         WHERE id NOT IN (SELECT MAX(id) FROM task_entries
+                           GROUP BY student_id, task_def_id, day_of_week)
+    ''')
+    if c.rowcount:
+        log.warning("Removed %s duplicate task_entries cells", c.rowcount)
+    c.execute('DROP INDEX IF EXISTS idx_task_entries_student_def_day')
+    c.execute(f'''CREATE UNIQUE INDEX IF NOT EXISTS {TASK_ENTRIES_KEY}
+                  ON task_entries(student_id, task_def_id, day_of_week)''')
+    return True
+
+def add_day_columns(conn):
+    """Add the DAY_COLUMNS generated columns to daily_reports where missing; returns their names."""
+    c = conn.cursor()
+    c.execute("SELECT name FROM sqlite_master WHERE type='table'")
+    if 'daily_reports' not in {row[0] for row in c.fetchall()}:
+        return []
+    c.execute("SELECT name FROM pragma_table_xinfo('daily_reports')")
+    existing = {row[0] for row in c.fetchall()}
+    added = []
+    for name, expression in DAY_COLUMNS.items():
+        if name in existing:
+            continue
+        try:
+            c.execute(f'ALTER TABLE daily_reports ADD COLUMN {name} INTEGER '
+                      f'GENERATED ALWAYS AS ({expression}) VIRTUAL')
+            added.append(name)
+        except sqlite3.OperationalError as e:
+            if 'duplicate column' not in str(e):     # another worker added it first
+                raise
+    return added
+
+def fill_carry_forward_state(c):
+    """Insert the carry_forward_state intervals of every daily report; returns the rows added.
+
+    Each field's date is the running MAX of the dates it was saved on, and
+    its value is read back from that report through idx_daily_reports_user_date.
+    """
+    set_dates = ', '.join(f'MAX(CASE WHEN "{field}" IS NOT NULL THEN date END) OVER w AS {field}_date'
+                          for field in CARRY_FORWARD_FIELDS)
+    values = ', '.join(f'{field}.{field}, s.{field}_date' for field in CARRY_FORWARD_FIELDS)
+    joins = ' '.join(f'LEFT JOIN daily_reports {field} ON {field}.user_id = s.user_id '
+                     f'AND {field}.date = s.{field}_date' for field in CARRY_FORWARD_FIELDS)
+    any_set = ' OR '.join(f'"{field}" IS NOT NULL' for field in CARRY_FORWARD_FIELDS)
+    c.execute(f'''
+        INSERT OR IGNORE INTO carry_forward_state
+        SELECT s.user_id, s.date, {values}
+          FROM (SELECT user_id, date, {set_dates}
+                  FROM daily_reports
+                 WHERE {any_set}
+                WINDOW w AS (PARTITION BY user_id ORDER BY date)) s
+          {joins}
+    ''')
+    return c.rowcount
+
+def backfill_carry_forward_state(conn):
+    """Fill carry_forward_state for a database that has reports but no intervals yet."""
+    c = conn.cursor()
+    c.execute("SELECT name FROM sqlite_master WHERE type='table'")
+    if 'daily_reports' not in {row[0] for row in c.fetchall()}:
+        return 0
+    c.execute('SELECT EXISTS (SELECT 1 FROM carry_forward_state), EXISTS (SELECT 1 FROM daily_reports)')
+    if c.fetchone() != (0, 1):
+        return 0
+    if not conn.in_transaction:
+        c.execute('BEGIN IMMEDIATE')      # one worker backfills, the others wait and skip
+        c.execute('SELECT EXISTS (SELECT 1 FROM carry_forward_state)')
+        if c.fetchone()[0]:
+            conn.commit()
+            return 0
+    added = fill_carry_forward_state(c)
+    log.info("Backfilled %s carry-forward intervals", added)
+    return added
+
 def init_db():
     with sqlite3.connect(DATABASE) as conn:
         c = conn.cursor()
@@ -138,6 +456,8 @@ def init_db():
             ON daily_reports(user_id, date)
         """)
 
+        ensure_schema(conn)
+
         conn.commit()
 
 if __name__ == '__main__':
@@ -0,0 +1,178 @@
+"""Vectorized reading analytics over whole daily_reports histories.
+
+Applies the reading rules of weekly progress (app._compute_week_progress) to
+every report of every requested student at once, with NumPy arrays instead
+of a per-day loop:
+
+* a day's reading delta is its accumulated_reading_percent minus the
+  previous one, floored at 0, or the whole accumulated percent when a new
+  book starts (a different title, or the percent going down);
+* a day's expected percent is round-half-up(100 * rate / word_count / 7)
+  with the rate and word count carried forward from earlier reports;
+* like weekly progress, each week starts from the context of the last report
+  before its Monday, so weekly sums match weekly_aggregates.
+
+Rows are ordered by (user_id, date).  Row-level arrays hold one entry per
+report, day-level arrays one entry per calendar day from the Monday of a
+student's first report to the Sunday of their last, so they reshape to
+(weeks, 7).
+"""
+import numpy as np
+
+DEFAULT_WEEKLY_RATE = 35000     # words per week when a student never saved a rate
+
+def load_history(cursor, user_ids=None):
+    """Every daily report of user_ids (all students if None) as NumPy arrays."""
+    where = ''
+    params = []
+    if user_ids is not None:
+        where = f"WHERE user_id IN ({','.join('?' * len(user_ids))})"
+        params = list(user_ids)
+    cursor.execute(f'''
+        SELECT user_id, date, accumulated_reading_percent, book_title,
+               word_count, expected_weekly_reading_rate
+          FROM daily_reports
+          {where}
+         ORDER BY user_id, date
+    ''', params)
+    rows = cursor.fetchall()
+    users, dates, acc, titles, counts, rates = zip(*rows) if rows else ((),) * 6
+    title_codes = {}
+    return {
+        'user': np.array(users, dtype=np.int64),
+        'day': np.array(dates, dtype='datetime64[D]').astype(np.int64),   # days since 1970-01-01
+        'acc': np.array(acc, dtype=np.float64),           # None -> nan
+        'title': np.array([-1 if t is None else title_codes.setdefault(t, len(title_codes))
+                           for t in titles], dtype=np.int64),
+        'count': np.array(counts, dtype=np.float64),
+        'rate': np.array(rates, dtype=np.float64),
+    }
+
+def _ffill(values, valid):
+    """values with every invalid entry replaced by the last valid one before it."""
+    idx = np.where(valid, np.arange(len(values)), 0)
+    np.maximum.accumulate(idx, out=idx)
+    return values[idx]
+
+def _shift(values, fill):
+    """values moved one place to the right, fill first."""
+    out = np.empty_like(values)
+    out[:1] = fill
+    out[1:] = values[:-1]
+    return out
+
+def _week(day):
+    # 1970-01-05 was a Monday
+    return (day + 3) // 7
+
+def analyze(history):
+    """Daily deltas, expected percents, words read and finished books for history.
+
+    Returns a dict of arrays: row level ('delta', 'new_book', 'finished'),
+    day level ('day_user', 'day', 'delta_day', 'expected_day', 'words_day',
+    'finished_day') and week level ('week_user', 'week_monday' and the
+    per-week sums 'reading', 'expected', 'words', 'books_finished').
+    """
+    user, day, acc, title = history['user'], history['day'], history['acc'], history['title']
+    count, rate = history['count'], history['rate']
+    n = len(user)
+    if n == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return {key: empty for key in ('delta', 'new_book', 'finished', 'day_user', 'day', 'delta_day',
+                                       'expected_day', 'words_day', 'finished_day', 'week_user',
+                                       'week_monday', 'reading', 'expected', 'words', 'books_finished')}
+
+    # ---- row level: the same rules as the weekly-progress day loop
+    first_of_user = _shift(user, -1) != user
+    week_start = first_of_user | (_shift(_week(day), -1) != _week(day))
+    # context going into a week: the last report before its Monday
+    ctx_read = np.where(first_of_user, 0.0, np.nan_to_num(_shift(acc, 0.0), nan=0.0))
+    ctx_title = np.where(first_of_user, -1, _shift(title, -1))
+
+    missing = np.isnan(acc)
+    acc_f = _ffill(np.where(missing & week_start, ctx_read, acc), ~missing | week_start)
+    prev_read = np.where(week_start, ctx_read, _shift(acc_f, 0.0))
+    untitled = title == -1
+    title_f = _ffill(np.where(untitled & week_start, ctx_title, title), ~untitled | week_start)
+    prev_title = np.where(week_start, ctx_title, _shift(title_f, -1))
+
+    new_book = (~untitled & ((prev_title == -1) | (title != prev_title))) | (acc_f < prev_read)
+    delta = np.where(new_book, acc_f, np.maximum(0.0, acc_f - prev_read))
+    finished = (acc_f >= 100) & (new_book | (prev_read < 100))
+
+    # ---- day level: whole weeks from each student's first to last report
+    students, first_row = np.unique(user, return_index=True)
+    last_row = np.append(first_row[1:], n) - 1
+    start = _week(day[first_row]) * 7 - 3                     # Mondays
+    length = (_week(day[last_row]) * 7 + 3) - start + 1       # through Sundays
+    offset = np.concatenate(([0], np.cumsum(length)[:-1]))
+    total = int(length.sum())
+    student_of_day = np.repeat(np.arange(len(students)), length)
+    day_ord = start[student_of_day] + np.arange(total) - offset[student_of_day]
+    student_of_row = np.repeat(np.arange(len(students)), last_row - first_row + 1)
+    pos = offset[student_of_row] + day - start[student_of_row]
+
+    # rate / count applicable each day: saved ones carried within the week,
+    # seeded on Mondays from the last report before it (the rate defaults
+    # to 35000 only for students who never saved one)
+    monday = (np.arange(total) - offset[student_of_day]) % 7 == 0
+    ctx = np.searchsorted(student_of_row * (2 ** 32) + day, student_of_day * (2 ** 32) + day_ord) - 1
+    has_ctx = (ctx >= 0) & (student_of_row[np.maximum(ctx, 0)] == student_of_day)
+    ever_set = np.zeros(len(students), dtype=bool)
+    ever_set[student_of_row[~np.isnan(rate)]] = True
+
+    def carried(values, default=None):
+        saved = np.full(total, np.nan)
+        saved[pos] = values
+        seed = np.where(has_ctx, values[np.maximum(ctx, 0)], np.nan)
+        if default is not None:
+            seed = np.where(np.isnan(seed) & ~ever_set[student_of_day], default, seed)
+        return _ffill(np.where(np.isnan(saved) & monday, seed, saved), ~np.isnan(saved) | monday)
+
+    rate_day = carried(rate, DEFAULT_WEEKLY_RATE)
+    count_day = carried(count)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        raw = (100.0 * rate_day / count_day) / 7.0
+    expected_day = np.where(~np.isnan(raw) & (count_day > 0), np.floor(raw + 0.5), 0.0)
+
+    delta_day = np.zeros(total)
+    delta_day[pos] = delta
+    finished_day = np.zeros(total, dtype=np.int64)
+    finished_day[pos] = finished
+    words_day = np.nan_to_num(delta_day / 100.0 * count_day, nan=0.0)
+
+    return {
+        'delta': delta, 'new_book': new_book, 'finished': finished,
+        'day_user': students[student_of_day], 'day': day_ord,
+        'delta_day': delta_day, 'expected_day': expected_day,
+        'words_day': words_day, 'finished_day': finished_day,
+        'week_user': students[student_of_day[::7]], 'week_monday': day_ord[::7],
+        'reading': delta_day.reshape(-1, 7).sum(axis=1),
+        'expected': expected_day.reshape(-1, 7).sum(axis=1),
+        'words': words_day.reshape(-1, 7).sum(axis=1),
+        'books_finished': finished_day.reshape(-1, 7).sum(axis=1),
+    }
+
+def _iso(days):
+    return np.asarray(days).astype('datetime64[D]').astype(str).tolist()
+
+def weekly_summaries(analysis):
+    """{user_id: [{week, reading_percent, expected_reading_percent, words_read, books_finished}]}."""
+    out = {}
+    weeks = zip(analysis['week_user'].tolist(), _iso(analysis['week_monday']),
+                np.round(analysis['reading'], 2).tolist(), analysis['expected'].astype(np.int64).tolist(),
+                np.round(analysis['words']).astype(np.int64).tolist(), analysis['books_finished'].tolist())
+    for user_id, week, reading, expected, words, books in weeks:
+        out.setdefault(user_id, []).append({
+            'week': week, 'reading_percent': reading, 'expected_reading_percent': expected,
+            'words_read': words, 'books_finished': books})
+    return out
+
+def daily_curves(analysis, user_id):
+    """Cumulative actual and expected reading percent per calendar day for one student."""
+    mask = analysis['day_user'] == user_id
+    return {
+        'dates': _iso(analysis['day'][mask]),
+        'actual': np.round(np.cumsum(analysis['delta_day'][mask]), 2).tolist(),
+        'expected': np.cumsum(analysis['expected_day'][mask]).astype(np.int64).tolist(),
+    }